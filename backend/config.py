@@ -5,8 +5,8 @@ Configuration settings
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
-from functools import lru_cache
-from typing import List
+from functools import cached_property
+from typing import Tuple
 import os
 import secrets
 
@@ -38,6 +38,13 @@ class Settings(BaseSettings):
         description="Token expiration time in minutes"
     )
     
+    BCRYPT_ROUNDS: int = Field(
+        default=12,
+        ge=4,
+        le=31,
+        description="bcrypt cost factor (use 4 only for tests)"
+    )
+    
     # CORS - Allowed Origins
     ALLOWED_ORIGINS: str = Field(
         default="http://localhost:3000",
@@ -60,6 +67,13 @@ class Settings(BaseSettings):
         description="Rate limit period in seconds"
     )
     
+    # Server
+    WORKERS: int = Field(
+        default=1,
+        ge=1,
+        description="Uvicorn worker processes; rate limits and caches are per process"
+    )
+    
     # Logging
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
     LOG_DIR: str = Field(default="logs", description="Log directory")
@@ -77,10 +91,10 @@ class Settings(BaseSettings):
             )
         return v
     
-    @property
-    def cors_origins(self) -> List[str]:
-        """Parse ALLOWED_ORIGINS string into list"""
-        return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
+    @cached_property
+    def cors_origins(self) -> Tuple[str, ...]:
+        """Parse ALLOWED_ORIGINS string into tuple (computed once)"""
+        return tuple(origin.strip() for origin in self.ALLOWED_ORIGINS.split(","))
     
     @property
     def is_production(self) -> bool:
@@ -93,9 +107,8 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-@lru_cache()
-def get_settings() -> Settings:
-    """Get cached settings instance"""
+def _load_settings() -> Settings:
+    """Load settings from the environment"""
     try:
         return Settings()
     except Exception as e:
@@ -105,4 +118,9 @@ def get_settings() -> Settings:
         raise
 
 
-settings = get_settings()
+settings = _load_settings()
+
+
+def get_settings() -> Settings:
+    """Get the settings instance"""
+    return settings
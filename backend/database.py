@@ -2,27 +2,66 @@
 LANCH - Database connection and session management
 """
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, literal
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 import os
+import orjson
 
 # Ensure database directory exists
 os.makedirs(os.path.dirname(settings.DATABASE_URL.replace("sqlite:///", "")), exist_ok=True)
 
+# Pool sizing: sync endpoints run on the AnyIO threadpool (40 threads), but
+# SQLite serializes writers on the file lock, so more than about two
+# connections per core only queue there. pool_size = min(32, 2 * cores + 1),
+# plus a small overflow for bursts. Connections are local files, so
+# pre-ping and recycling would only add round-trips.
+POOL_SIZE = min(32, (os.cpu_count() or 1) * 2 + 1)
+POOL_MAX_OVERFLOW = 10
+
+# Hand out the most recently returned connection first. Each connection
+# holds its own page cache (cache_size below), so reusing the few warm ones
+# beats spreading a light load over every pooled connection.
+POOL_USE_LIFO = True
+
+# Compiled SQL kept per engine. The default of 500 entries is shared by
+# every distinct statement shape (filters, eager loads, page sizes), and
+# evictions mean recompiling on the request path.
+QUERY_CACHE_SIZE = 1200
+
 # Create engine with SQLite optimizations
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False},
-    echo=settings.DEBUG
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+    pool_use_lifo=POOL_USE_LIFO,
+    query_cache_size=QUERY_CACHE_SIZE,
+    echo=settings.DEBUG,
+    # JSON columns (audit old_value/new_value) go through orjson
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads
 )
 
-# Enable foreign keys for SQLite
+# Enable foreign keys and write-friendly settings for SQLite:
+# synchronous=NORMAL under WAL avoids an fsync per commit,
+# 64MB page cache and 256MB mmap keep hot pages in memory.
+# WAL itself is stored in the database file, so init_db sets it once.
+SQLITE_PRAGMAS = """
+PRAGMA foreign_keys=ON;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-65536;
+PRAGMA mmap_size=268435456;
+PRAGMA busy_timeout=5000;
+"""
+
+
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.executescript(SQLITE_PRAGMAS)
     cursor.close()
 
 # Session factory
@@ -45,7 +84,20 @@ def init_db():
     """Initialize the database with schema"""
     from models import usuario, categoria, produto, funcionario, competencia, pedido, audit
     
-    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    
+    # Skip DDL entirely when every mapped table already exists (the usual restart case)
+    existing_tables = set(inspect(engine).get_table_names())
+    if not existing_tables.issuperset(Base.metadata.tables):
+        Base.metadata.create_all(bind=engine)
+    
+    # create_all never adds columns or indexes to tables that already exist
+    _add_missing_columns()
+    _merge_duplicate_consumos()
+    _create_missing_indexes()
+    _encode_enum_columns()
+    _add_legacy_default_triggers()
     
     # Create initial data
     db = SessionLocal()
@@ -59,11 +111,134 @@ def init_db():
         db.close()
 
 
+def _add_missing_columns():
+    """Add nullable model columns missing from an existing database"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {
+                row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")
+            }
+            if not existing:
+                continue
+            
+            for column in table.columns:
+                if column.name in existing or not column.nullable or column.server_default is not None:
+                    continue
+                
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                # Existing rows take the model's scalar default instead of NULL
+                if column.default is not None and column.default.is_scalar:
+                    value = literal(column.default.arg, column.type).compile(
+                        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    ddl += f" DEFAULT {value}"
+                conn.exec_driver_sql(ddl)
+
+
+def _merge_duplicate_consumos():
+    """
+    Fold duplicate monthly consumption rows into one before the unique index
+    
+    Older versions created the row with a read-then-insert, so concurrent
+    orders could leave several rows for one employee and competency.
+    """
+    with engine.begin() as conn:
+        if conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'ix_consumo_funcionario_competencia'"
+        ).first():
+            return
+        conn.exec_driver_sql("""
+            UPDATE consumos_mensais SET valor_total = (
+                SELECT sum(c.valor_total) FROM consumos_mensais c
+                WHERE c.funcionario_id = consumos_mensais.funcionario_id
+                AND c.competencia_id = consumos_mensais.competencia_id
+            )
+            WHERE id IN (
+                SELECT min(id) FROM consumos_mensais
+                GROUP BY funcionario_id, competencia_id HAVING count(*) > 1
+            )
+        """)
+        conn.exec_driver_sql("""
+            DELETE FROM consumos_mensais WHERE id NOT IN (
+                SELECT min(id) FROM consumos_mensais GROUP BY funcionario_id, competencia_id
+            )
+        """)
+
+
+# Indexes created by older versions and since replaced
+OBSOLETE_INDEXES = ("ix_usuarios_username_cover", "ix_audit_logs_table_name")
+
+
+def _create_missing_indexes():
+    """Create model indexes missing from an existing database"""
+    with engine.begin() as conn:
+        existing = set(conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).scalars())
+        for name in OBSOLETE_INDEXES:
+            if name in existing:
+                conn.exec_driver_sql(f"DROP INDEX {name}")
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+
+
+def _encode_enum_columns():
+    """Rewrite enum names left in integer-coded columns by older versions"""
+    from models.types import EnumInt
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if isinstance(column.type, EnumInt):
+                    names = ", ".join(f"'{name}'" for name in column.type.legacy_names())
+                    conn.exec_driver_sql(
+                        f"UPDATE {table.name} SET {column.name} = {column.type.legacy_case(column.name)} "
+                        f"WHERE {column.name} IN ({names})"
+                    )
+
+
+def _add_legacy_default_triggers():
+    """
+    Fill server defaults missing from tables created by older versions
+    
+    SQLite cannot add a DEFAULT to an existing column, so an insert trigger
+    sets the value instead whenever the column was declared without one.
+    """
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = [c for c in table.columns if c.server_default is not None]
+            if not columns:
+                continue
+            
+            declared = {
+                row[1]: row[4] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")
+            }
+            for column in columns:
+                if column.name not in declared or declared[column.name] is not None:
+                    continue
+                
+                default = column.server_default.arg
+                if isinstance(default, str):
+                    default = "'" + default.replace("'", "''") + "'"
+                else:
+                    default = default.compile(dialect=engine.dialect)
+                
+                conn.exec_driver_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS trg_{table.name}_{column.name}_default "
+                    f"AFTER INSERT ON {table.name} WHEN NEW.{column.name} IS NULL "
+                    f"BEGIN UPDATE {table.name} SET {column.name} = {default} "
+                    f"WHERE rowid = NEW.rowid; END"
+                )
+
+
 def _create_initial_data(db):
     """Create initial data if not exists"""
     from models.usuario import Usuario
     from models.categoria import Categoria
     from models.competencia import Competencia
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
     from utils.security import get_password_hash
     from datetime import datetime
     
@@ -81,10 +256,11 @@ def _create_initial_data(db):
     
     # Create default categories
     default_categories = ["Lanches", "Bebidas", "Salgados", "Doces", "Refeições"]
-    for cat_name in default_categories:
-        cat = db.query(Categoria).filter(Categoria.nome == cat_name).first()
-        if not cat:
-            db.add(Categoria(nome=cat_name, ativo=True))
+    db.execute(
+        sqlite_insert(Categoria)
+        .values([{"nome": cat_name, "ativo": True} for cat_name in default_categories])
+        .on_conflict_do_nothing(index_elements=["nome"])
+    )
     
     # Create current competency
     now = datetime.now()
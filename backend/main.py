@@ -3,14 +3,16 @@ LANCH - Sistema de Lanchonete Hospitalar
 Main Application Entry Point
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from contextlib import asynccontextmanager
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+from contextlib import asynccontextmanager, redirect_stdout
+import io
 import os
+import sys
+import orjson
 from pathlib import Path
 
 from config import settings
@@ -21,7 +23,8 @@ from routers import (
     admin_router, audit_router, estoque_router, caixa_router,
     setores_router, print_router
 )
-from middleware import limiter, RateLimitMiddleware
+from middleware import limiter, RateLimitMiddleware, RateLimitExceeded, rate_limit_exceeded_handler
+from middleware.audit import audit_writer
 from middleware.error_handler import (
     http_exception_handler,
     validation_exception_handler,
@@ -42,55 +45,67 @@ logger = setup_logging(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database and validate configuration on startup"""
-    print("=" * 60)
-    print("🚀 Iniciando LANCH - Sistema de Lanchonete Hospitalar")
-    print("=" * 60)
-    
-    # Validate environment configuration
-    print("🔍 Validando configuração...")
-    if not validate_environment():
-        print("\n❌ Falha na validação do ambiente. Corrija os erros acima.")
-        raise SystemExit(1)
-    
-    # Create required directories
-    print("📁 Verificando diretórios necessários...")
-    base_path = Path(__file__).parent.parent
-    required_dirs = ['logs', 'exports', 'backups']
-    for dir_name in required_dirs:
-        dir_path = base_path / dir_name
-        if not dir_path.exists():
-            dir_path.mkdir(parents=True, exist_ok=True)
-            print(f"   ✓ Criado: {dir_name}/")
-    
-    # Validate configuration
-    print(f"📋 Versão: {settings.APP_VERSION}")
-    print(f"🔧 Ambiente: {'PRODUÇÃO' if settings.is_production else 'DESENVOLVIMENTO'}")
-    print(f"🔒 CORS Origens: {', '.join(settings.cors_origins)}")
-    
-    # Security warnings
-    if settings.DEBUG:
-        print("⚠️  AVISO: Modo DEBUG está ATIVO - NÃO usar em produção!")
-    
-    if "localhost" in settings.ALLOWED_ORIGINS and settings.is_production:
-        print("⚠️  AVISO: CORS permite localhost em produção!")
-    
-    # Initialize database
-    print("💾 Inicializando banco de dados...")
-    init_db()
-    print("✅ Banco de dados inicializado")
-    
-    logger.info(
-        "Application started",
-        extra={"version": settings.APP_VERSION, "environment": "production" if settings.is_production else "development"}
-    )
-    
-    print("=" * 60)
-    print("✅ Aplicação iniciada com sucesso!")
-    print("=" * 60)
+    # Buffer the startup banner (including output from validation and
+    # database setup) and write it out in one go
+    banner = io.StringIO()
+    try:
+        with redirect_stdout(banner):
+            print("=" * 60)
+            print("🚀 Iniciando LANCH - Sistema de Lanchonete Hospitalar")
+            print("=" * 60)
+            
+            # Validate environment configuration
+            print("🔍 Validando configuração...")
+            if not validate_environment():
+                print("\n❌ Falha na validação do ambiente. Corrija os erros acima.")
+                raise SystemExit(1)
+            
+            # Create required directories
+            print("📁 Verificando diretórios necessários...")
+            base_path = Path(__file__).parent.parent
+            required_dirs = ['logs', 'exports', 'backups']
+            for dir_name in required_dirs:
+                dir_path = base_path / dir_name
+                if not dir_path.exists():
+                    dir_path.mkdir(parents=True, exist_ok=True)
+                    print(f"   ✓ Criado: {dir_name}/")
+            
+            # Validate configuration
+            print(f"📋 Versão: {settings.APP_VERSION}")
+            print(f"🔧 Ambiente: {'PRODUÇÃO' if settings.is_production else 'DESENVOLVIMENTO'}")
+            print(f"🔒 CORS Origens: {', '.join(settings.cors_origins)}")
+            
+            # Security warnings
+            if settings.DEBUG:
+                print("⚠️  AVISO: Modo DEBUG está ATIVO - NÃO usar em produção!")
+            
+            if "localhost" in settings.ALLOWED_ORIGINS and settings.is_production:
+                print("⚠️  AVISO: CORS permite localhost em produção!")
+            
+            # Initialize database
+            print("💾 Inicializando banco de dados...")
+            init_db()
+            print("✅ Banco de dados inicializado")
+            
+            # Start batched audit log writer
+            await audit_writer.start()
+            
+            logger.info(
+                "Application started",
+                extra={"version": settings.APP_VERSION, "environment": "production" if settings.is_production else "development"}
+            )
+            
+            print("=" * 60)
+            print("✅ Aplicação iniciada com sucesso!")
+            print("=" * 60)
+    finally:
+        sys.stdout.write(banner.getvalue())
+        sys.stdout.flush()
     
     yield
     
     logger.info("Application shutting down")
+    await audit_writer.stop()
     print("👋 Encerrando aplicação")
 
 
@@ -98,6 +113,7 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Sistema de gestão para lanchonete hospitalar com suporte a convênio de funcionários e vendas à vista.",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -108,31 +124,19 @@ app.add_exception_handler(Exception, general_exception_handler)
 
 # Add rate limiter state
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 # CORS configuration - Using environment-configured origins
-# Special handling for local files (null origin) in development
-allowed_origins = settings.cors_origins.copy()
-
-# In development mode, also allow all origins for easier testing
+# In development mode, allow all origins for easier testing
+cors_kwargs = dict(
+    allow_origins=["*"] if settings.DEBUG else settings.cors_origins,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+    allow_headers=["Content-Type", "Authorization"],
+)
 if settings.DEBUG:
     print("⚠️  DEBUG mode: CORS accepting all origins for development")
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],  # Allow all in debug mode
-        allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
-        allow_headers=["Content-Type", "Authorization"],
-    )
-else:
-    # Production: strict CORS
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=allowed_origins,
-        allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
-        allow_headers=["Content-Type", "Authorization"],
-    )
+app.add_middleware(CORSMiddleware, **cors_kwargs)
 
 # Add rate limiting middleware
 app.add_middleware(RateLimitMiddleware)
@@ -152,22 +156,40 @@ app.include_router(setores_router)
 app.include_router(print_router)
 
 
+# Static payloads, serialized once
+_ROOT_BYTES = orjson.dumps({
+    "app": settings.APP_NAME,
+    "version": settings.APP_VERSION,
+    "status": "running"
+})
+_HEALTH_BYTES = orjson.dumps({"status": "healthy"})
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "app": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running"
-    }
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check for monitoring"""
-    return {"status": "healthy"}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    if settings.DEBUG:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # "auto" picks uvloop where available (not on Windows)
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="auto",
+            http="httptools",
+            # Rate limiter and caches live in each process, so every extra
+            # worker multiplies the login attempts a client gets
+            workers=settings.WORKERS
+        )
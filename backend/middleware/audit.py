@@ -1,34 +1,182 @@
 """
 Audit Middleware for automatic change tracking
 """
+import asyncio
 from functools import wraps
-from datetime import datetime
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Set
 from fastapi import Request
+from starlette.datastructures import Headers
 from sqlalchemy.orm import Session
 
+from database import SessionLocal
 from models.audit import AuditLog
 from models import Usuario
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AuditWriter:
+    """
+    Background writer that batches audit entries
+    
+    Entries are queued as plain column mappings and flushed by a single task
+    every ``flush_interval`` seconds, or as soon as ``batch_size`` entries are
+    waiting, using one session and one commit per batch.
+    """
+    
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.25):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Entries taken off the queue but not yet handed to a write
+        self._pending: List[Dict[str, Any]] = []
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """Start the consumer task on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the consumer and flush whatever is still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        
+        batch = self._drain(self._pending)
+        self._pending = []
+        if batch:
+            self._write(batch)
+    
+    def enqueue(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queue an entry, returning False if the writer is not running
+        
+        Safe to call from sync endpoints running in the threadpool; the put
+        is handed to the writer's event loop.
+        """
+        if not self.running:
+            return False
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._put(entry)
+        else:
+            self._loop.call_soon_threadsafe(self._put, entry)
+        return True
+    
+    def _put(self, entry: Dict[str, Any]):
+        self._queue.put_nowait(entry)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+    
+    async def _run(self):
+        while True:
+            self._pending = [await self._queue.get()]
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            
+            batch = self._drain(self._pending)
+            self._pending = []
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                logger.error("Audit batch write failed: %s", e, extra={"entries": len(batch)})
+    
+    def _drain(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+    
+    @staticmethod
+    def _write(batch: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(AuditLog, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+audit_writer = AuditWriter()
+
+# Timestamp shared by entries logged within the same event loop tick
+_last_tick: float = -1.0
+_last_dt: Optional[datetime] = None
+
+
+def _now() -> datetime:
+    """Current UTC time, refreshed at most once per millisecond of loop time"""
+    global _last_tick, _last_dt
+    try:
+        tick = asyncio.get_running_loop().time()
+    except RuntimeError:
+        return datetime.now(timezone.utc)
+    if _last_dt is None or tick - _last_tick > 0.001:
+        _last_dt = datetime.now(timezone.utc)
+        _last_tick = tick
+    return _last_dt
+
+
+# Direct writes started when the writer is not running. The loop only keeps
+# weak references to tasks, so they are held here until they finish.
+_direct_writes: Set[asyncio.Task] = set()
+
+
+def _direct_write_done(task: asyncio.Task):
+    _direct_writes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Audit write failed: %s", task.exception())
+
+
+def _write_in_background(entry: Dict[str, Any]):
+    """Write one entry off the event loop without awaiting it"""
+    task = asyncio.create_task(asyncio.to_thread(AuditWriter._write, [entry]))
+    _direct_writes.add(task)
+    task.add_done_callback(_direct_write_done)
 
 
 class AuditLogger:
     """Utility class for audit logging"""
     
     @staticmethod
-    def get_client_ip(request: Request) -> str:
+    def get_client_ip(request: Request, headers: Optional[Headers] = None) -> str:
         """Extract client IP from request"""
-        if "x-forwarded-for" in request.headers:
-            return request.headers["x-forwarded-for"].split(",")[0]
+        forwarded_for = (headers or request.headers).get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",", 1)[0].strip()
         return request.client.host if request.client else "unknown"
     
     @staticmethod
-    def get_user_agent(request: Request) -> str:
+    def get_user_agent(request: Request, headers: Optional[Headers] = None) -> str:
         """Extract user agent from request"""
-        return request.headers.get("user-agent", "unknown")
+        return (headers or request.headers).get("user-agent", "unknown")
     
     @staticmethod
-    async def log(
-        db: Session,
+    def build_entry(
         action: str,
         user: Optional[Usuario] = None,
         table_name: Optional[str] = None,
@@ -38,10 +186,17 @@ class AuditLogger:
         request: Optional[Request] = None,
         description: Optional[str] = None,
         status: str = "SUCCESS"
-    ):
-        """Create audit log entry"""
-        log_entry = AuditLog(
-            timestamp=datetime.utcnow(),
+    ) -> Dict[str, Any]:
+        """Build the audit log column mapping without touching a session"""
+        ip_address = user_agent = endpoint = None
+        if request:
+            headers = request.headers
+            ip_address = AuditLogger.get_client_ip(request, headers)
+            user_agent = AuditLogger.get_user_agent(request, headers)
+            endpoint = request.url.path
+        
+        return dict(
+            timestamp=_now(),
             user_id=user.id if user else None,
             username=user.username if user else "system",
             action=action,
@@ -49,15 +204,23 @@ class AuditLogger:
             record_id=record_id,
             old_value=old_value,
             new_value=new_value,
-            ip_address=AuditLogger.get_client_ip(request) if request else None,
-            user_agent=AuditLogger.get_user_agent(request) if request else None,
-            endpoint=str(request.url.path) if request else None,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            endpoint=endpoint,
             description=description,
             status=status
         )
+    
+    @staticmethod
+    async def log(db: Session, action: str, **kwargs):
+        """Create audit log entry"""
+        log_entry = AuditLogger.build_entry(action, **kwargs)
         
-        db.add(log_entry)
-        db.commit()
+        # Written in batches by the background writer; commit directly
+        # only when it isn't running (scripts, tests without lifespan)
+        if not audit_writer.enqueue(log_entry):
+            db.add(AuditLog(**log_entry))
+            db.commit()
         return log_entry
 
 
@@ -85,18 +248,21 @@ def audit_action(action: str, table: str, get_record_id=None):
                 try:
                     record_id = get_record_id(result) if get_record_id else None
                     
-                    await AuditLogger.log(
-                        db=db,
-                        action=action,
+                    # Plain payload only: the request session is closed once
+                    # the dependency exits, so the writer uses its own
+                    entry = AuditLogger.build_entry(
+                        action,
                         user=current_user,
                         table_name=table,
                         record_id=record_id,
-                        new_value=result.dict() if hasattr(result, 'dict') else None,
+                        new_value=result.model_dump(mode="json") if hasattr(result, 'model_dump') else None,
                         request=request
                     )
+                    if not audit_writer.enqueue(entry):
+                        _write_in_background(entry)
                 except Exception as e:
                     # Don't fail the request if audit logging fails
-                    print(f"Audit logging failed: {e}")
+                    logger.warning("Audit logging failed: %s", e)
             
             return result
         return wrapper
@@ -4,10 +4,9 @@ Catches and logs all unhandled exceptions, returning formatted JSON responses
 """
 
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-import traceback
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,7 +15,8 @@ logger = get_logger(__name__)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions"""
     logger.warning(
-        f"HTTP Exception: {exc.status_code}",
+        "HTTP Exception: %s",
+        exc.status_code,
         extra={
             "path": request.url.path,
             "method": request.method,
@@ -25,7 +25,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         }
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": type(exc).__name__,
@@ -37,18 +37,19 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors"""
+    raw_errors = exc.errors()
     logger.warning(
         "Validation Error",
         extra={
             "path": request.url.path,
             "method": request.method,
-            "errors": exc.errors()
+            "errors": raw_errors
         }
     )
     
     # Format validation errors for better UX
     errors = []
-    for error in exc.errors():
+    for error in raw_errors:
         field = " -> ".join(str(loc) for loc in error["loc"])
         errors.append({
             "field": field,
@@ -56,7 +57,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "type": error["type"]
         })
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "error": "ValidationError",
@@ -68,20 +69,20 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle all other exceptions"""
-    # Log the full traceback
-    tb = traceback.format_exc()
+    # Log the full traceback (rendered by the handler only when emitted)
     logger.error(
-        f"Unhandled Exception: {type(exc).__name__}",
+        "Unhandled Exception: %s",
+        type(exc).__name__,
+        exc_info=(type(exc), exc, exc.__traceback__),
         extra={
             "path": request.url.path,
             "method": request.method,
-            "exception": str(exc),
-            "traceback": tb
+            "exception": str(exc)
         }
     )
     
     # Return generic error to user (don't expose internals)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "InternalServerError",
@@ -3,6 +3,7 @@ import sqlite3
 import os
 
 DB_PATH = "c:/Lanch/database/lanch.db"
+SCHEMA_VERSION = 1
 
 def migrate():
     if not os.path.exists(DB_PATH):
@@ -10,22 +11,36 @@ def migrate():
         return
 
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
         cursor = conn.cursor()
         
-        # Check if columns exist
-        cursor.execute("PRAGMA table_info(produtos)")
-        columns = [info[1] for info in cursor.fetchall()]
+        # Already migrated
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= SCHEMA_VERSION:
+            print("Database already up to date")
+            conn.close()
+            return
         
-        if "controlar_estoque" not in columns:
-            print("Adding controlar_estoque column...")
-            cursor.execute("ALTER TABLE produtos ADD COLUMN controlar_estoque BOOLEAN DEFAULT 0")
-        
-        if "estoque_atual" not in columns:
-            print("Adding estoque_atual column...")
-            cursor.execute("ALTER TABLE produtos ADD COLUMN estoque_atual INTEGER DEFAULT 0")
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Databases created by create_all may already have the columns
+            cursor.execute("PRAGMA table_info(produtos)")
+            columns = [info[1] for info in cursor.fetchall()]
+            
+            if "controlar_estoque" not in columns:
+                print("Adding controlar_estoque column...")
+                cursor.execute("ALTER TABLE produtos ADD COLUMN controlar_estoque BOOLEAN DEFAULT 0")
             
-        conn.commit()
+            if "estoque_atual" not in columns:
+                print("Adding estoque_atual column...")
+                cursor.execute("ALTER TABLE produtos ADD COLUMN estoque_atual INTEGER DEFAULT 0")
+            
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        
         print("Migration successful!")
         conn.close()
     except Exception as e:
@@ -6,10 +6,11 @@ from .produto import Produto
 from .funcionario import Funcionario
 from .competencia import Competencia, ConsumoMensal, StatusCompetencia
 from .pedido import Pedido, ItemPedido, TipoCliente, StatusPedido, FormaPagamento
-from .audit import AuditLog
+from .audit import AuditLog, AuditDailyRollup
 from .estoque import StockMovement, MovementType
 from .caixa import Caixa, TransacaoCaixa, CaixaStatus, TransactionType
 from .setor import Setor
+from .sequencia import Sequencia
 
 
 
@@ -2,7 +2,7 @@
 Audit Log Model for LANCH System
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, JSON, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -11,6 +11,11 @@ from database import Base
 class AuditLog(Base):
     """Audit log for tracking all system changes"""
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_user_time", "user_id", "timestamp"),
+        Index("ix_audit_table_record", "table_name", "record_id"),
+        Index("ix_audit_timestamp_action", "timestamp", "action"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -21,7 +26,7 @@ class AuditLog(Base):
     
     # Action details
     action = Column(String, nullable=False, index=True)  # CREATE, UPDATE, DELETE, LOGIN, LOGOUT
-    table_name = Column(String, nullable=True, index=True)
+    table_name = Column(String, nullable=True)
     record_id = Column(Integer, nullable=True)
     
     # Change tracking
@@ -42,3 +47,39 @@ class AuditLog(Base):
 
     def __repr__(self):
         return f"<AuditLog(id={self.id}, action={self.action}, user={self.username}, timestamp={self.timestamp})>"
+
+
+class AuditDailyRollup(Base):
+    """
+    Audit entry counts per day, action, table and user
+    
+    Kept current by a trigger on audit_logs. Missing table/user values are
+    stored as '' so the key stays unique.
+    """
+    __tablename__ = "audit_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    action = Column(String, primary_key=True)
+    table_name = Column(String, primary_key=True, default="")
+    username = Column(String, primary_key=True, default="")
+    cnt = Column(Integer, nullable=False, default=0)
+
+
+# Runs after create_all: backfill from existing logs (only fills keys that
+# are missing, i.e. everything on a fresh rollup table), then keep the
+# rollup current on every insert
+event.listen(Base.metadata, "after_create", DDL("""
+    INSERT OR IGNORE INTO audit_daily_rollup (day, action, table_name, username, cnt)
+    SELECT date(timestamp), action, coalesce(table_name, ''), coalesce(username, ''), count(*)
+    FROM audit_logs
+    GROUP BY 1, 2, 3, 4
+"""))
+event.listen(Base.metadata, "after_create", DDL("""
+    CREATE TRIGGER IF NOT EXISTS trg_audit_daily_rollup
+    AFTER INSERT ON audit_logs
+    BEGIN
+        INSERT INTO audit_daily_rollup (day, action, table_name, username, cnt)
+        VALUES (date(NEW.timestamp), NEW.action, coalesce(NEW.table_name, ''), coalesce(NEW.username, ''), 1)
+        ON CONFLICT (day, action, table_name, username) DO UPDATE SET cnt = cnt + 1;
+    END
+"""))
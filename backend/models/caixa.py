@@ -3,12 +3,13 @@ LANCH - Cash Register Model (Caixa)
 Financial control for daily cash management
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 import enum
 
 from database import Base
+from models.types import EnumInt
 
 
 class CaixaStatus(str, enum.Enum):
@@ -44,8 +45,19 @@ class Caixa(Base):
     usuario_fechamento_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     fechado_em = Column(DateTime, nullable=True)
     
+    # Running totals, updated with every transaction. Registers opened before
+    # these existed have NULL transacoes_count until they are closed.
+    total_vendas = Column(Numeric(10, 2), nullable=True)
+    total_dinheiro = Column(Numeric(10, 2), nullable=True)
+    total_cartao = Column(Numeric(10, 2), nullable=True)
+    total_pix = Column(Numeric(10, 2), nullable=True)
+    total_convenio = Column(Numeric(10, 2), nullable=True)
+    total_sangrias = Column(Numeric(10, 2), nullable=True)
+    total_suprimentos = Column(Numeric(10, 2), nullable=True)
+    transacoes_count = Column(Integer, nullable=True)
+    
     # Status
-    status = Column(String(20), default=CaixaStatus.ABERTO.value)
+    status = Column(EnumInt(CaixaStatus), default=CaixaStatus.ABERTO)
     observacoes = Column(Text, nullable=True)
     
     # Relationships
@@ -60,11 +72,15 @@ class Caixa(Base):
 class TransacaoCaixa(Base):
     """Cash transaction model"""
     __tablename__ = "transacoes_caixa"
+    __table_args__ = (
+        # Covers the per-register GROUP BY summaries (SQLite has no INCLUDE)
+        Index("ix_transacao_caixa_tipo_fp", "caixa_id", "tipo", "forma_pagamento", "valor"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     caixa_id = Column(Integer, ForeignKey("caixa.id"), nullable=False)
     
-    tipo = Column(String(20), nullable=False)  # VENDA, SANGRIA, SUPRIMENTO, TROCO
+    tipo = Column(EnumInt(TransactionType), nullable=False)
     valor = Column(Numeric(10, 2), nullable=False)
     forma_pagamento = Column(String(20), nullable=True)  # DINHEIRO, CARTAO, PIX, CONVENIO
     
@@ -2,7 +2,7 @@
 LANCH - Competencia Model
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -42,11 +42,15 @@ class Competencia(Base):
 
 class ConsumoMensal(Base):
     __tablename__ = "consumos_mensais"
+    __table_args__ = (
+        Index("ix_consumo_competencia", "competencia_id", "valor_total"),
+        Index("ix_consumo_funcionario_competencia", "funcionario_id", "competencia_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     funcionario_id = Column(Integer, ForeignKey("funcionarios.id"), nullable=False)
     competencia_id = Column(Integer, ForeignKey("competencias.id"), nullable=False)
-    valor_total = Column(Integer, nullable=False, default=0)
+    valor_total = Column(Numeric(10, 2), nullable=False, default=0)
     atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -59,6 +63,6 @@ class ConsumoMensal(Base):
             "funcionario_id": self.funcionario_id,
             "funcionario_nome": self.funcionario.nome if self.funcionario else None,
             "competencia_id": self.competencia_id,
-            "valor_total": float(self.valor_total) / 100,
+            "valor_total": float(self.valor_total),
             "referencia": self.competencia.to_dict()["referencia"] if self.competencia else None
         }
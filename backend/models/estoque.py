@@ -3,12 +3,13 @@ LANCH - Stock Movement Model
 Tracks all stock entries, exits, and adjustments
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy.sql import func
 import enum
 
 from database import Base
+from models.types import EnumInt
 
 
 class MovementType(str, enum.Enum):
@@ -22,17 +23,24 @@ class MovementType(str, enum.Enum):
 class StockMovement(Base):
     """Stock movement tracking model"""
     __tablename__ = "movimentacoes_estoque"
+    __table_args__ = (
+        Index("ix_mov_produto_criado", "produto_id", "criado_em"),
+        # Movement listing: date range newest first, product/type filtered in the index
+        Index("ix_mov_criado_produto_tipo", "criado_em", "produto_id", "tipo"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
-    tipo = Column(String(20), nullable=False)  # ENTRADA, SAIDA, AJUSTE, VENDA
+    tipo = Column(EnumInt(MovementType), nullable=False)
     quantidade = Column(Integer, nullable=False)
     quantidade_anterior = Column(Integer, default=0)
     quantidade_nova = Column(Integer, default=0)
     motivo = Column(Text, nullable=True)
     referencia = Column(String(100), nullable=True)  # e.g., order_id, invoice number
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
-    criado_em = Column(DateTime, default=datetime.utcnow)
+    # Also rendered in the INSERT: the value RETURNING hands back must not
+    # depend on the legacy default trigger, which runs after it
+    criado_em = Column(DateTime, default=func.now(), server_default=func.now())
     
     # Relationships
     produto = relationship("Produto", back_populates="movimentacoes")
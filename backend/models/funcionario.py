@@ -33,17 +33,12 @@ class Funcionario(Base):
     consumos = relationship("ConsumoMensal", back_populates="funcionario")
     pedidos = relationship("Pedido", back_populates="funcionario")
     
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "matricula": self.matricula,
-            "cpf": self.cpf,
-            "nome": self.nome,
-            "setor": self.setor.nome if self.setor else self.setor_nome,
-            "setor_id": self.setor_id,
-            "centro_custo": self.setor.centro_custo if self.setor else self.centro_custo,
-            "limite_mensal": float(self.limite_mensal),
-            "ativo": self.ativo,
-            "criado_em": str(self.criado_em) if self.criado_em else None
-        }
-
+    @property
+    def setor_exibicao(self):
+        """Sector name, falling back to the legacy text column"""
+        return self.setor.nome if self.setor else self.setor_nome
+    
+    @property
+    def centro_custo_exibicao(self):
+        """Cost center, taken from the sector when linked"""
+        return self.setor.centro_custo if self.setor else self.centro_custo
@@ -2,10 +2,11 @@
 LANCH - Pedido Model
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
+from models.types import EnumInt
 import enum
 
 
@@ -31,6 +32,11 @@ class FormaPagamento(str, enum.Enum):
 
 class Pedido(Base):
     __tablename__ = "pedidos"
+    __table_args__ = (
+        Index("ix_pedidos_status_criado", "status", "criado_em"),
+        Index("ix_pedidos_competencia_criado", "competencia_id", "criado_em"),
+        Index("ix_pedidos_criado", "criado_em"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     numero = Column(String, unique=True, nullable=False, index=True)
@@ -38,7 +44,7 @@ class Pedido(Base):
     funcionario_id = Column(Integer, ForeignKey("funcionarios.id"), nullable=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     valor_total = Column(Numeric(10, 2), nullable=False, default=0)
-    status = Column(String, nullable=False, default="PENDENTE")
+    status = Column(EnumInt(StatusPedido), nullable=False, default=StatusPedido.PENDENTE)
     forma_pagamento = Column(String, nullable=False)
     competencia_id = Column(Integer, ForeignKey("competencias.id"), nullable=True)
     observacao = Column(Text, nullable=True)
@@ -51,21 +57,18 @@ class Pedido(Base):
     competencia = relationship("Competencia", back_populates="pedidos")
     itens = relationship("ItemPedido", back_populates="pedido", cascade="all, delete-orphan")
     
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "numero": self.numero,
-            "tipo_cliente": self.tipo_cliente,
-            "funcionario_id": self.funcionario_id,
-            "funcionario_nome": self.funcionario.nome if self.funcionario else None,
-            "funcionario_matricula": self.funcionario.matricula if self.funcionario else None,
-            "valor_total": float(self.valor_total),
-            "status": self.status,
-            "forma_pagamento": self.forma_pagamento,
-            "observacao": self.observacao,
-            "criado_em": str(self.criado_em) if self.criado_em else None,
-            "itens": [item.to_dict() for item in self.itens] if self.itens else []
-        }
+    @property
+    def funcionario_nome(self):
+        return self.funcionario.nome if self.funcionario else None
+    
+    @property
+    def funcionario_matricula(self):
+        return self.funcionario.matricula if self.funcionario else None
+
+
+# Reports filter and group orders by day with date(criado_em); SQLite only
+# uses an index for that expression if the index is built on it
+Index("ix_pedidos_data", func.date(Pedido.criado_em))
 
 
 class ItemPedido(Base):
@@ -82,12 +85,6 @@ class ItemPedido(Base):
     pedido = relationship("Pedido", back_populates="itens")
     produto = relationship("Produto")
     
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "produto_id": self.produto_id,
-            "produto_nome": self.produto.nome if self.produto else None,
-            "quantidade": self.quantidade,
-            "preco_unitario": float(self.preco_unitario),
-            "subtotal": float(self.subtotal)
-        }
+    @property
+    def produto_nome(self):
+        return self.produto.nome if self.produto else None
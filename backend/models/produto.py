@@ -27,14 +27,6 @@ class Produto(Base):
     categoria = relationship("Categoria", back_populates="produtos")
     movimentacoes = relationship("StockMovement", back_populates="produto")
     
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "nome": self.nome,
-            "categoria_id": self.categoria_id,
-            "categoria_nome": self.categoria.nome if self.categoria else None,
-            "preco": float(self.preco),
-            "ativo": self.ativo,
-            "controlar_estoque": self.controlar_estoque,
-            "estoque_atual": self.estoque_atual
-        }
+    @property
+    def categoria_nome(self):
+        return self.categoria.nome if self.categoria else None
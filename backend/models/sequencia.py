@@ -0,0 +1,47 @@
+"""
+LANCH - Sequencia Model
+Named counters for identifiers that must be unique and gap-free
+"""
+
+from sqlalchemy import Column, Integer, String, update
+from sqlalchemy.dialects.sqlite import insert
+
+from database import Base
+
+
+class Sequencia(Base):
+    """Named counter holding the last value handed out"""
+    __tablename__ = "sequencias"
+    
+    nome = Column(String(50), primary_key=True)
+    valor = Column(Integer, nullable=False, default=0)
+    
+    @classmethod
+    def reservar(cls, db, nome: str, quantidade: int = 1, inicio=0) -> range:
+        """
+        Reserve the next ``quantidade`` values of a sequence in one statement
+        
+        ``inicio`` (a value or scalar subquery) is only used when the sequence
+        does not exist yet. The reservation is part of the caller's
+        transaction, so a rollback gives the values back.
+        """
+        # Existing sequences are bumped by primary key, so ``inicio`` is only
+        # evaluated by the reservation that creates the row
+        ultimo = db.execute(
+            update(cls).where(cls.nome == nome).values(
+                valor=cls.valor + quantidade
+            ).returning(cls.valor)
+        ).scalar_one_or_none()
+        if ultimo is not None:
+            return range(ultimo - quantidade + 1, ultimo + 1)
+        
+        # The upsert still covers a concurrent first reservation
+        stmt = insert(cls).values(
+            nome=nome, valor=inicio + quantidade
+        ).on_conflict_do_update(
+            index_elements=[cls.nome],
+            set_={"valor": cls.valor + quantidade}
+        ).returning(cls.valor)
+        
+        ultimo = db.execute(stmt).scalar_one()
+        return range(ultimo - quantidade + 1, ultimo + 1)
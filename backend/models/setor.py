@@ -5,7 +5,7 @@ Organizational structure for employee grouping and consumption tracking
 
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy.sql import func
 
 from database import Base
 
@@ -30,25 +30,11 @@ class Setor(Base):
     
     # Status
     ativo = Column(Boolean, default=True)
-    criado_em = Column(DateTime, default=datetime.utcnow)
-    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    criado_em = Column(DateTime, server_default=func.now())
+    atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     funcionarios = relationship("Funcionario", back_populates="setor")
     
     def __repr__(self):
         return f"<Setor {self.nome} ({self.centro_custo})>"
-    
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "nome": self.nome,
-            "codigo": self.codigo,
-            "centro_custo": self.centro_custo,
-            "limite_mensal": float(self.limite_mensal) if self.limite_mensal else None,
-            "limite_por_funcionario": float(self.limite_por_funcionario) if self.limite_por_funcionario else None,
-            "responsavel": self.responsavel,
-            "email_responsavel": self.email_responsavel,
-            "descricao": self.descricao,
-            "ativo": self.ativo
-        }
@@ -0,0 +1,47 @@
+"""
+LANCH - Custom Column Types
+"""
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+
+class EnumInt(TypeDecorator):
+    """
+    Store a string enum as a small integer
+
+    Members are numbered by declaration order, so new members must only be
+    appended. Values are bound from members or their names and read back as
+    plain strings, exactly like the former VARCHAR columns. Rows written
+    before the conversion (still holding the name) are read back unchanged.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_cls = enum_cls
+        self._codes = {member.value: code for code, member in enumerate(enum_cls)}
+        self._values = [member.value for member in enum_cls]
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._codes[self.enum_cls(value).value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str) and not value.isdigit():
+            return value
+        return self._values[int(value)]
+
+    def legacy_names(self):
+        """Names the enum was stored as before the conversion"""
+        return list(self._codes)
+
+    def legacy_case(self, column: str) -> str:
+        """SQL CASE mapping stored names of this enum to their codes"""
+        whens = " ".join(f"WHEN '{name}' THEN {code}" for name, code in self._codes.items())
+        return f"CASE {column} {whens} END"
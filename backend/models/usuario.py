@@ -2,9 +2,10 @@
 LANCH - Usuario Model
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index, text
 from sqlalchemy.sql import func
 from database import Base
+from models.types import EnumInt
 import enum
 
 
@@ -16,22 +17,20 @@ class PerfilUsuario(str, enum.Enum):
 
 class Usuario(Base):
     __tablename__ = "usuarios"
+    __table_args__ = (
+        # Covers the login lookup for active users only, so deactivated
+        # accounts do not grow the hot index
+        Index(
+            "ix_usuarios_username_active", "username", "password_hash", "perfil", "ativo", "id",
+            unique=True, sqlite_where=text("ativo = 1")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
     nome = Column(String, nullable=False)
-    perfil = Column(String, nullable=False)
+    perfil = Column(EnumInt(PerfilUsuario), nullable=False)
     ativo = Column(Boolean, default=True, nullable=False)
     criado_em = Column(DateTime, server_default=func.now())
     atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
-    
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "username": self.username,
-            "nome": self.nome,
-            "perfil": self.perfil,
-            "ativo": self.ativo,
-            "criado_em": str(self.criado_em) if self.criado_em else None
-        }
@@ -2,17 +2,23 @@
 LANCH - Admin Router
 """
 
-import shutil
+import asyncio
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import exists, insert
+import zstandard as zstd
 
 from database import get_db
 from models import Usuario
 from schemas import UsuarioCreate, UsuarioResponse
-from routers.auth import require_admin
+from routers.auth import require_admin, require_admin_token_only
 from utils.security import get_password_hash
 from utils.logger import get_logger
 from config import settings
@@ -20,6 +26,8 @@ from config import settings
 router = APIRouter(prefix="/admin", tags=["Admin"])
 logger = get_logger(__name__)
 
+VALID_PERFIS = ["ADMIN", "ATENDENTE", "COZINHA"]
+
 
 @router.post("/usuarios", response_model=UsuarioResponse, dependencies=[Depends(require_admin)])
 async def criar_usuario(
@@ -31,25 +39,23 @@ async def criar_usuario(
     Requer permissão de administrador
     """
     # Verificar se username já existe
-    existing_user = db.query(Usuario).filter(Usuario.username == usuario.username).first()
-    if existing_user:
+    if db.query(exists().where(Usuario.username == usuario.username)).scalar():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Nome de usuário já existe"
         )
     
     # Validar perfil
-    valid_perfis = ["ADMIN", "ATENDENTE", "COZINHA"]
-    if usuario.perfil not in valid_perfis:
+    if usuario.perfil not in VALID_PERFIS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Perfil inválido. Deve ser um de: {', '.join(valid_perfis)}"
+            detail=f"Perfil inválido. Deve ser um de: {', '.join(VALID_PERFIS)}"
         )
     
     # Criar novo usuário
     novo_usuario = Usuario(
         username=usuario.username,
-        password_hash=get_password_hash(usuario.password),
+        password_hash=await run_in_threadpool(get_password_hash, usuario.password),
         nome=usuario.nome,
         perfil=usuario.perfil,
         ativo=True
@@ -64,7 +70,103 @@ async def criar_usuario(
     return novo_usuario
 
 
-@router.post("/backup", dependencies=[Depends(require_admin)])
+# bcrypt releases the GIL, so hashing parallelizes across threads. A small
+# dedicated pool keeps a large batch from occupying the request threadpool
+PASSWORD_HASH_WORKERS = min(4, os.cpu_count() or 1)
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+
+async def _hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash several passwords in parallel on the shared hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(_hash_executor, get_password_hash, password)
+        for password in passwords
+    ))
+
+
+@router.post("/usuarios/bulk", response_model=List[UsuarioResponse], dependencies=[Depends(require_admin)])
+async def criar_usuarios_em_lote(
+    usuarios: List[UsuarioCreate],
+    db: Session = Depends(get_db)
+):
+    """
+    Criar vários usuários em uma única transação
+    Requer permissão de administrador
+    """
+    if not usuarios:
+        return []
+    
+    usernames = [u.username for u in usuarios]
+    if len(set(usernames)) != len(usernames):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nomes de usuário repetidos na requisição"
+        )
+    
+    existentes = [
+        username for (username,) in
+        db.query(Usuario.username).filter(Usuario.username.in_(usernames))
+    ]
+    if existentes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nomes de usuário já existem: {', '.join(existentes)}"
+        )
+    
+    invalidos = {u.perfil for u in usuarios if u.perfil not in VALID_PERFIS}
+    if invalidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Perfil inválido. Deve ser um de: {', '.join(VALID_PERFIS)}"
+        )
+    
+    hashes = await _hash_passwords([u.password for u in usuarios])
+    
+    db.execute(insert(Usuario), [
+        {
+            "username": u.username,
+            "password_hash": password_hash,
+            "nome": u.nome,
+            "perfil": u.perfil,
+            "ativo": True
+        }
+        for u, password_hash in zip(usuarios, hashes)
+    ])
+    db.commit()
+    
+    logger.info(f"{len(usuarios)} usuários criados em lote")
+    
+    return db.query(Usuario).filter(Usuario.username.in_(usernames)).order_by(Usuario.id).all()
+
+
+def _snapshot_database(db_path: str, backup_path: str):
+    """
+    Write a consistent, zstd-compressed copy of the database
+    
+    Uses SQLite's online backup API in small page steps so writers are not
+    blocked, then compresses the snapshot.
+    """
+    snapshot_path = backup_path + ".tmp"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(snapshot_path)
+    try:
+        src.backup(dst, pages=1024, sleep=0.001)
+    finally:
+        dst.close()
+        src.close()
+    
+    try:
+        with open(snapshot_path, "rb") as f_in, open(backup_path, "wb") as f_out:
+            zstd.ZstdCompressor(level=3).copy_stream(f_in, f_out)
+    finally:
+        os.remove(snapshot_path)
+
+
+@router.post("/backup", dependencies=[Depends(require_admin_token_only)])
 async def backup_database():
     """Create a backup of the SQLite database"""
     # Source database path
@@ -85,11 +187,11 @@ async def backup_database():
     os.makedirs(backup_dir, exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_filename = f"lanch_backup_{timestamp}.db"
+    backup_filename = f"lanch_backup_{timestamp}.db.zst"
     backup_path = os.path.join(backup_dir, backup_filename)
     
     try:
-        shutil.copy2(db_path, backup_path)
+        await run_in_threadpool(_snapshot_database, db_path, backup_path)
         return {"message": "Backup created successfully", "filename": backup_filename, "path": backup_path}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
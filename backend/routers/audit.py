@@ -1,38 +1,39 @@
 """
 Audit Log Router
 """
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import func, tuple_
 from typing import Optional
 from datetime import datetime, timedelta
 
 from database import get_db
-from models import Usuario
-from models.audit import AuditLog
-from routers.auth import require_admin
-from utils.pagination import paginate, PaginatedResponse
+from models.audit import AuditLog, AuditDailyRollup
+from routers.auth import require_admin_token_only
+from schemas.audit import AuditLogResponse, AuditLogPage
+from utils.pagination import encode_cursor, decode_cursor
 
 
 router = APIRouter(prefix="/audit", tags=["Auditoria"])
 
 
-@router.get("/logs", response_model=PaginatedResponse)
+@router.get("/logs", response_model=AuditLogPage, dependencies=[Depends(require_admin_token_only)])
 async def get_audit_logs(
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
     action: Optional[str] = None,
     table_name: Optional[str] = None,
     username: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    db: Session = Depends(get_db)
 ):
     """
-    Get audit logs with filtering and pagination
+    Get audit logs with filtering and keyset pagination
+    Pass the returned next_cursor to fetch the following page
     Requires admin role
     """
-    query = db.query(AuditLog)
+    query = db.query(AuditLog).options(raiseload("*"))
     
     # Apply filters
     if action:
@@ -50,57 +51,71 @@ async def get_audit_logs(
     if end_date:
         query = query.filter(AuditLog.timestamp <= end_date)
     
-    # Order by most recent first
-    query = query.order_by(AuditLog.timestamp.desc())
+    if cursor:
+        try:
+            cursor_timestamp, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.filter(tuple_(AuditLog.timestamp, AuditLog.id) < (cursor_timestamp, cursor_id))
     
-    # Paginate results
-    return paginate(query, page, limit)
+    # Order by most recent first; one extra row tells whether more remain
+    logs = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    
+    return AuditLogPage(
+        items=[AuditLogResponse.model_validate(log) for log in logs],
+        limit=limit,
+        has_more=has_more,
+        next_cursor=encode_cursor(logs[-1].timestamp, logs[-1].id) if has_more else None
+    )
 
 
-@router.get("/stats")
+@router.get("/stats", dependencies=[Depends(require_admin_token_only)])
 async def get_audit_stats(
     days: int = Query(7, ge=1, le=90),
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    db: Session = Depends(get_db)
 ):
     """
     Get audit statistics for the last N days
     """
     start_date = datetime.utcnow() - timedelta(days=days)
+    since = start_date.date()
+    
+    # Counts come from the per-day rollup maintained by a trigger
+    total = func.sum(AuditDailyRollup.cnt)
     
     # Total actions
-    total_actions = db.query(AuditLog).filter(
-        AuditLog.timestamp >= start_date
-    ).count()
+    total_actions = db.query(total).filter(AuditDailyRollup.day >= since).scalar() or 0
     
     # Actions by type
     actions_by_type = db.query(
-        AuditLog.action,
-        db.func.count(AuditLog.id)
+        AuditDailyRollup.action,
+        total
     ).filter(
-        AuditLog.timestamp >= start_date
-    ).group_by(AuditLog.action).all()
+        AuditDailyRollup.day >= since
+    ).group_by(AuditDailyRollup.action).all()
     
     # Most active users
     most_active_users = db.query(
-        AuditLog.username,
-        db.func.count(AuditLog.id).label('count')
+        AuditDailyRollup.username,
+        total.label('count')
     ).filter(
-        AuditLog.timestamp >= start_date,
-        AuditLog.username.isnot(None)
-    ).group_by(AuditLog.username).order_by(
-        db.func.count(AuditLog.id).desc()
+        AuditDailyRollup.day >= since,
+        AuditDailyRollup.username != ""
+    ).group_by(AuditDailyRollup.username).order_by(
+        total.desc()
     ).limit(10).all()
     
     # Most modified tables
     most_modified_tables = db.query(
-        AuditLog.table_name,
-        db.func.count(AuditLog.id).label('count')
+        AuditDailyRollup.table_name,
+        total.label('count')
     ).filter(
-        AuditLog.timestamp >= start_date,
-        AuditLog.table_name.isnot(None)
-    ).group_by(AuditLog.table_name).order_by(
-        db.func.count(AuditLog.id).desc()
+        AuditDailyRollup.day >= since,
+        AuditDailyRollup.table_name != ""
+    ).group_by(AuditDailyRollup.table_name).order_by(
+        total.desc()
     ).limit(10).all()
     
     return {
@@ -119,11 +134,10 @@ async def get_audit_stats(
     }
 
 
-@router.get("/logs/{log_id}")
+@router.get("/logs/{log_id}", response_model=AuditLogResponse, dependencies=[Depends(require_admin_token_only)])
 async def get_audit_log_detail(
     log_id: int,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    db: Session = Depends(get_db)
 ):
     """Get detailed information about a specific audit log entry"""
     log = db.query(AuditLog).filter(AuditLog.id == log_id).first()
@@ -4,16 +4,19 @@ LANCH - Authentication Router
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import select, bindparam, lambda_stmt, text
 from datetime import timedelta
-import re
+from cachetools import TTLCache
+from threading import Lock
+import string
 
 from database import get_db
 from models import Usuario
 from schemas import Token, LoginRequest, UsuarioResponse, TokenData, ChangePasswordRequest
 from utils.security import verify_password, create_access_token, decode_access_token, get_password_hash
 from utils.logger import get_logger
-from config import settings
 from middleware import limiter
 
 logger = get_logger(__name__)
@@ -24,6 +27,53 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 # Default admin password hash for detection
 DEFAULT_ADMIN_PASSWORD = "admin123"
 
+# User lookup by username, compiled once and reused
+_user_by_username = lambda_stmt(
+    lambda: select(Usuario).where(Usuario.username == bindparam("username"))
+)
+
+# Login only needs what the partial covering index of active users holds.
+# No INDEXED BY hint: the planner is free to choose, and login keeps working
+# on a database where that index is missing
+_login_columns = (Usuario.id, Usuario.username, Usuario.password_hash, Usuario.perfil, Usuario.ativo)
+_login_active_by_username = text(
+    "SELECT id, username, password_hash, perfil, ativo "
+    "FROM usuarios WHERE username = :username AND ativo = 1"
+).columns(*_login_columns)
+_login_by_username = text(
+    "SELECT id, username, password_hash, perfil, ativo "
+    "FROM usuarios WHERE username = :username"
+).columns(*_login_columns)
+
+# Detached snapshots of recently authenticated users, keyed by username.
+# get_current_user runs on threadpool threads and TTLCache is not thread safe
+_user_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+_user_cache_lock = Lock()
+
+
+def _snapshot_user(user: Usuario) -> Usuario:
+    """Copy a loaded user's columns into a detached instance safe to cache"""
+    snapshot = Usuario(**{
+        column.key: getattr(user, column.key) for column in Usuario.__table__.columns
+    })
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def _find_login_user(db: Session, username: str):
+    """Fetch the login columns for username, trying active users first"""
+    user = db.execute(_login_active_by_username, {"username": username}).one_or_none()
+    if user is None:
+        # Unknown or inactive; the full lookup tells them apart
+        user = db.execute(_login_by_username, {"username": username}).one_or_none()
+    return user
+
+
+def invalidate_user_cache(username: str):
+    """Drop a cached user after its row changes"""
+    with _user_cache_lock:
+        _user_cache.pop(username, None)
+
 
 def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -44,9 +94,18 @@ def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(Usuario).filter(Usuario.username == username).first()
-    if user is None:
-        raise credentials_exception
+    with _user_cache_lock:
+        cached = _user_cache.get(username)
+    if cached is not None:
+        # Attach a copy to this session without querying
+        user = db.merge(cached, load=False)
+    else:
+        user = db.execute(_user_by_username, {"username": username}).scalar_one_or_none()
+        if user is None:
+            raise credentials_exception
+        snapshot = _snapshot_user(user)
+        with _user_cache_lock:
+            _user_cache[username] = snapshot
     
     if not user.ativo:
         raise HTTPException(
@@ -67,6 +126,35 @@ def require_admin(current_user: Usuario = Depends(get_current_user)) -> Usuario:
     return current_user
 
 
+def require_admin_token_only(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    Require admin role using only the signed token claims
+    
+    Skips the user lookup, so a deactivated or demoted admin keeps access
+    until the token expires. Use only on endpoints that never need the
+    Usuario row.
+    """
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if payload.get("perfil") != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    
+    return TokenData(
+        username=payload["sub"],
+        user_id=payload.get("user_id"),
+        perfil=payload["perfil"]
+    )
+
+
 def require_atendente(current_user: Usuario = Depends(get_current_user)) -> Usuario:
     """Require atendente or admin role"""
     if current_user.perfil not in ["ADMIN", "ATENDENTE"]:
@@ -84,7 +172,7 @@ async def get_current_user_info(current_user: Usuario = Depends(get_current_user
 
 
 @router.post("/token", response_model=Token)
-@limiter.limit(f"{settings.LOGIN_RATE_LIMIT}/minute")
+@limiter.limit
 async def login_for_access_token(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -93,9 +181,9 @@ async def login_for_access_token(
     """OAuth2 compatible token login with rate limiting"""
     logger.info(f"Login attempt for user: {form_data.username}")
     
-    user = db.query(Usuario).filter(Usuario.username == form_data.username).first()
+    user = _find_login_user(db, form_data.username)
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.password_hash):
         logger.warning(f"Failed login attempt for user: {form_data.username}", extra={"username": form_data.username})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,7 +199,7 @@ async def login_for_access_token(
         )
     
     # Check for default password
-    if user.username == "admin" and verify_password(DEFAULT_ADMIN_PASSWORD, user.password_hash):
+    if user.username == "admin" and await run_in_threadpool(verify_password, DEFAULT_ADMIN_PASSWORD, user.password_hash):
         logger.warning("Admin login with default password detected!")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -128,7 +216,7 @@ async def login_for_access_token(
 
 
 @router.post("/login", response_model=Token)
-@limiter.limit(f"{settings.LOGIN_RATE_LIMIT}/minute")
+@limiter.limit
 async def login(
     request: Request,
     credentials: LoginRequest,
@@ -137,9 +225,9 @@ async def login(
     """Simple login endpoint with rate limiting"""
     logger.info(f"Login attempt for user: {credentials.username}")
     
-    user = db.query(Usuario).filter(Usuario.username == credentials.username).first()
+    user = _find_login_user(db, credentials.username)
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await run_in_threadpool(verify_password, credentials.password, user.password_hash):
         logger.warning(f"Failed login attempt for user: {credentials.username}", extra={"username": credentials.username})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -154,7 +242,7 @@ async def login(
         )
     
     # Check for default password
-    if user.username == "admin" and verify_password(DEFAULT_ADMIN_PASSWORD, user.password_hash):
+    if user.username == "admin" and await run_in_threadpool(verify_password, DEFAULT_ADMIN_PASSWORD, user.password_hash):
         logger.warning("Admin login with default password detected!")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -170,6 +258,12 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+# Character classes required in new passwords
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+
+
 def validate_password_strength(password: str) -> bool:
     """
     Validate password strength
@@ -185,19 +279,21 @@ def validate_password_strength(password: str) -> bool:
             detail="A senha deve ter no mínimo 8 caracteres"
         )
     
-    if not re.search(r"[A-Z]", password):
+    chars = set(password)
+    
+    if _UPPERCASE.isdisjoint(chars):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A senha deve conter pelo menos uma letra maiúscula"
         )
     
-    if not re.search(r"[a-z]", password):
+    if _LOWERCASE.isdisjoint(chars):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A senha deve conter pelo menos uma letra minúscula"
         )
     
-    if not re.search(r"\d", password):
+    if _DIGITS.isdisjoint(chars):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A senha deve conter pelo menos um número"
@@ -213,7 +309,7 @@ async def change_password(
     current_user: Usuario = Depends(get_current_user)
 ):
     """Change current user password with strength validation"""
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await run_in_threadpool(verify_password, password_data.current_password, current_user.password_hash):
         logger.warning(f"Failed password change - incorrect current password for user {current_user.username}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -224,14 +320,15 @@ async def change_password(
     validate_password_strength(password_data.new_password)
     
     # Prevent using same password
-    if verify_password(password_data.new_password, current_user.password_hash):
+    if await run_in_threadpool(verify_password, password_data.new_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A nova senha não pode ser igual à senha atual"
         )
     
-    current_user.password_hash = get_password_hash(password_data.new_password)
+    current_user.password_hash = await run_in_threadpool(get_password_hash, password_data.new_password)
     db.commit()
+    invalidate_user_cache(current_user.username)
     
     logger.info(f"Password changed successfully for user {current_user.username}", extra={"user_id": current_user.id})
     
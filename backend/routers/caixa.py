@@ -4,9 +4,9 @@ API endpoints for financial management
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, raiseload
+from sqlalchemy import func, cast, Float, select, bindparam
+from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 
@@ -24,15 +24,43 @@ from utils.logger import get_logger
 logger = get_logger(__name__)
 router = APIRouter(prefix="/caixa", tags=["Caixa"])
 
+# Hot statements are built once, so their compiled SQL is reused from the
+# engine cache instead of being rebuilt by a new query on every request
+_caixa_by_date = select(Caixa).where(Caixa.data == bindparam("data"))
+# One grouped row per (type, payment method) instead of every transaction
+_caixa_summary_rows = select(
+    TransacaoCaixa.tipo,
+    TransacaoCaixa.forma_pagamento,
+    func.coalesce(func.sum(cast(TransacaoCaixa.valor, Float)), 0.0),
+    func.count()
+).where(
+    TransacaoCaixa.caixa_id == bindparam("caixa_id")
+).group_by(TransacaoCaixa.tipo, TransacaoCaixa.forma_pagamento)
 
-def _get_or_create_today_caixa(db: Session) -> Caixa:
+
+# (date, caixa id) of the last register found for the current day. A day has
+# at most one register and its id never changes, so the entry only goes
+# stale at midnight or if the row is deleted, both checked on read.
+_today_caixa: Optional[Tuple[date, int]] = None
+
+
+def _get_or_create_today_caixa(db: Session) -> Optional[Caixa]:
     """Get today's cash register or return None if not opened"""
+    global _today_caixa
     today = date.today()
-    return db.query(Caixa).filter(Caixa.data == today).first()
+    
+    if _today_caixa is not None and _today_caixa[0] == today:
+        caixa = db.get(Caixa, _today_caixa[1])
+        if caixa is not None and caixa.data == today:
+            return caixa
+    
+    caixa = db.scalars(_caixa_by_date, {"data": today}).first()
+    _today_caixa = (today, caixa.id) if caixa else None
+    return caixa
 
 
 @router.post("/abrir", response_model=CaixaResponse)
-async def abrir_caixa(
+def abrir_caixa(
     dados: CaixaOpen,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -40,10 +68,11 @@ async def abrir_caixa(
     """
     Open cash register for today
     """
+    global _today_caixa
     today = date.today()
     
     # Check if already opened
-    existing = db.query(Caixa).filter(Caixa.data == today).first()
+    existing = _get_or_create_today_caixa(db)
     if existing:
         if existing.status == CaixaStatus.ABERTO.value:
             raise HTTPException(
@@ -60,34 +89,42 @@ async def abrir_caixa(
         data=today,
         valor_abertura=dados.valor_abertura,
         status=CaixaStatus.ABERTO.value,
-        usuario_abertura_id=current_user.id,
-        aberto_em=datetime.utcnow()
+        usuario_abertura=current_user,
+        aberto_em=datetime.utcnow(),
+        transacoes_count=0,
+        **{coluna: 0 for coluna in CAIXA_TOTAIS}
     )
     
-    db.add(caixa)
+    objetos = [caixa]
     
     # Add initial change as transaction if > 0
     if dados.valor_abertura > 0:
-        transacao = TransacaoCaixa(
+        caixa.total_suprimentos = dados.valor_abertura
+        caixa.transacoes_count = 1
+        objetos.append(TransacaoCaixa(
             caixa=caixa,
             tipo=TransactionType.TROCO.value,
             valor=dados.valor_abertura,
             descricao="Abertura de caixa - Troco inicial",
             usuario_id=current_user.id
-        )
-        db.add(transacao)
+        ))
     
+    # One flush inserts both rows; the response is built inside the same
+    # transaction so nothing has to be reloaded after the commit
+    db.add_all(objetos)
+    db.flush()
+    response = _format_caixa_response(caixa, db)
     db.commit()
-    db.refresh(caixa)
+    _today_caixa = (today, response.id)
     
     logger.info(f"Cash register opened with R${dados.valor_abertura}",
-                extra={"user_id": current_user.id, "caixa_id": caixa.id})
+                extra={"user_id": response.usuario_abertura_id, "caixa_id": response.id})
     
-    return _format_caixa_response(caixa, db)
+    return response
 
 
 @router.post("/fechar", response_model=CaixaResponse)
-async def fechar_caixa(
+def fechar_caixa(
     dados: CaixaClose,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -116,21 +153,30 @@ async def fechar_caixa(
     caixa.valor_esperado = resumo["valor_esperado"]
     caixa.diferenca = dados.valor_fechamento - resumo["valor_esperado"]
     caixa.status = CaixaStatus.FECHADO.value
-    caixa.usuario_fechamento_id = current_user.id
+    caixa.usuario_fechamento = current_user
     caixa.fechado_em = datetime.utcnow()
     caixa.observacoes = dados.observacoes
-    
+    caixa.total_vendas = resumo["total_vendas"]
+    caixa.total_dinheiro = resumo["vendas_dinheiro"]
+    caixa.total_cartao = resumo["vendas_cartao"]
+    caixa.total_pix = resumo["vendas_pix"]
+    caixa.total_convenio = resumo["vendas_convenio"]
+    caixa.total_sangrias = resumo["total_sangrias"]
+    caixa.total_suprimentos = resumo["total_suprimentos"]
+    caixa.transacoes_count = resumo["transacoes_count"]
+    
+    db.flush()
+    response = _format_caixa_response(caixa, db)
     db.commit()
-    db.refresh(caixa)
     
     logger.info(f"Cash register closed. Expected: R${resumo['valor_esperado']}, Actual: R${dados.valor_fechamento}",
-                extra={"user_id": current_user.id, "caixa_id": caixa.id, "diferenca": float(caixa.diferenca)})
+                extra={"user_id": response.usuario_fechamento_id, "caixa_id": response.id, "diferenca": response.diferenca})
     
-    return _format_caixa_response(caixa, db)
+    return response
 
 
 @router.get("/hoje", response_model=Optional[CaixaResponse])
-async def get_caixa_hoje(
+def get_caixa_hoje(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -146,7 +192,7 @@ async def get_caixa_hoje(
 
 
 @router.get("/resumo", response_model=CaixaResumo)
-async def get_resumo_caixa(
+def get_resumo_caixa(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -181,7 +227,7 @@ async def get_resumo_caixa(
 
 
 @router.post("/sangria", response_model=TransacaoResponse)
-async def registrar_sangria(
+def registrar_sangria(
     dados: SangriaCreate,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -202,21 +248,23 @@ async def registrar_sangria(
         tipo=TransactionType.SANGRIA.value,
         valor=dados.valor,
         descricao=dados.motivo,
-        usuario_id=current_user.id
+        usuario=current_user
     )
     
     db.add(transacao)
+    _add_to_caixa_totals(db, caixa, transacao)
+    db.flush()
+    response = _format_transacao_response(transacao)
     db.commit()
-    db.refresh(transacao)
     
     logger.info(f"Cash withdrawal: R${dados.valor} - {dados.motivo}",
-                extra={"user_id": current_user.id, "caixa_id": caixa.id})
+                extra={"user_id": response.usuario_id, "caixa_id": response.caixa_id})
     
-    return _format_transacao_response(transacao, db)
+    return response
 
 
 @router.post("/suprimento", response_model=TransacaoResponse)
-async def registrar_suprimento(
+def registrar_suprimento(
     dados: SuprimentoCreate,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -237,21 +285,23 @@ async def registrar_suprimento(
         tipo=TransactionType.SUPRIMENTO.value,
         valor=dados.valor,
         descricao=dados.descricao or "Suprimento de caixa",
-        usuario_id=current_user.id
+        usuario=current_user
     )
     
     db.add(transacao)
+    _add_to_caixa_totals(db, caixa, transacao)
+    db.flush()
+    response = _format_transacao_response(transacao)
     db.commit()
-    db.refresh(transacao)
     
     logger.info(f"Cash addition: R${dados.valor}",
-                extra={"user_id": current_user.id, "caixa_id": caixa.id})
+                extra={"user_id": response.usuario_id, "caixa_id": response.caixa_id})
     
-    return _format_transacao_response(transacao, db)
+    return response
 
 
 @router.get("/transacoes", response_model=List[TransacaoResponse])
-async def listar_transacoes(
+def listar_transacoes(
     data: Optional[date] = None,
     tipo: Optional[str] = None,
     db: Session = Depends(get_db),
@@ -266,18 +316,25 @@ async def listar_transacoes(
     if not caixa:
         return []
     
-    query = db.query(TransacaoCaixa).filter(TransacaoCaixa.caixa_id == caixa.id)
+    query = db.query(TransacaoCaixa).options(
+        joinedload(TransacaoCaixa.usuario),
+        joinedload(TransacaoCaixa.pedido).load_only(Pedido.id, Pedido.numero),
+        raiseload("*")
+    ).filter(TransacaoCaixa.caixa_id == caixa.id)
     
     if tipo:
+        # Unknown types have no integer code and can never match
+        if tipo.upper() not in TransactionType.__members__:
+            return []
         query = query.filter(TransacaoCaixa.tipo == tipo.upper())
     
     transacoes = query.order_by(TransacaoCaixa.criado_em.desc()).all()
     
-    return [_format_transacao_response(t, db) for t in transacoes]
+    return [_format_transacao_response(t) for t in transacoes]
 
 
 @router.get("/historico", response_model=List[CaixaResponse])
-async def listar_historico(
+def listar_historico(
     dias: int = Query(default=30, ge=1, le=365),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -287,7 +344,10 @@ async def listar_historico(
     """
     data_inicio = date.today() - timedelta(days=dias)
     
-    caixas = db.query(Caixa).filter(
+    caixas = db.query(Caixa).options(
+        joinedload(Caixa.usuario_abertura),
+        joinedload(Caixa.usuario_fechamento)
+    ).filter(
         Caixa.data >= data_inicio
     ).order_by(Caixa.data.desc()).all()
     
@@ -295,7 +355,7 @@ async def listar_historico(
 
 
 @router.get("/relatorio", response_model=RelatorioFinanceiro)
-async def relatorio_financeiro(
+def relatorio_financeiro(
     data_inicio: date = Query(...),
     data_fim: date = Query(...),
     db: Session = Depends(get_db),
@@ -310,22 +370,21 @@ async def relatorio_financeiro(
             detail="Data fim deve ser maior ou igual à data início"
         )
     
-    # Get all transactions in range
-    caixas = db.query(Caixa).filter(
-        and_(Caixa.data >= data_inicio, Caixa.data <= data_fim)
-    ).all()
-    
-    caixa_ids = [c.id for c in caixas]
-    
-    transacoes = db.query(TransacaoCaixa).filter(
-        TransacaoCaixa.caixa_id.in_(caixa_ids),
+    # Every register day in range, so days without sales still show up
+    dias = db.query(Caixa.data).filter(
+        Caixa.data.between(data_inicio, data_fim)
+    ).order_by(Caixa.data).all()
+    
+    # Sales summed per (day, payment method) in the database
+    vendas = db.query(
+        Caixa.data,
+        TransacaoCaixa.forma_pagamento,
+        func.coalesce(func.sum(cast(TransacaoCaixa.valor, Float)), 0.0),
+        func.count()
+    ).join(Caixa).filter(
+        Caixa.data.between(data_inicio, data_fim),
         TransacaoCaixa.tipo == TransactionType.VENDA.value
-    ).all()
-    
-    # Calculate totals
-    total_vendas = sum(float(t.valor) for t in transacoes)
-    total_pedidos = len(transacoes)
-    ticket_medio = total_vendas / total_pedidos if total_pedidos > 0 else 0
+    ).group_by(Caixa.data, TransacaoCaixa.forma_pagamento).all()
     
     # Group by payment method
     vendas_por_pagamento = {
@@ -335,20 +394,24 @@ async def relatorio_financeiro(
         "CONVENIO": 0
     }
     
-    for t in transacoes:
-        if t.forma_pagamento in vendas_por_pagamento:
-            vendas_por_pagamento[t.forma_pagamento] += float(t.valor)
-    
     # Group by day
-    vendas_por_dia = []
-    for caixa in caixas:
-        day_transacoes = [t for t in transacoes if t.caixa_id == caixa.id]
-        total = sum(float(t.valor) for t in day_transacoes)
-        vendas_por_dia.append({
-            "data": caixa.data.isoformat(),
-            "total": total,
-            "pedidos": len(day_transacoes)
-        })
+    por_dia = {dia: [0.0, 0] for dia, in dias}
+    
+    for dia, forma_pagamento, valor, count in vendas:
+        if forma_pagamento in vendas_por_pagamento:
+            vendas_por_pagamento[forma_pagamento] += valor
+        por_dia[dia][0] += valor
+        por_dia[dia][1] += count
+    
+    vendas_por_dia = [
+        {"data": dia.isoformat(), "total": total, "pedidos": pedidos}
+        for dia, (total, pedidos) in por_dia.items()
+    ]
+    
+    # Calculate totals
+    total_vendas = sum(total for total, _ in por_dia.values())
+    total_pedidos = sum(pedidos for _, pedidos in por_dia.values())
+    ticket_medio = total_vendas / total_pedidos if total_pedidos > 0 else 0
     
     return RelatorioFinanceiro(
         data_inicio=data_inicio,
@@ -363,45 +426,107 @@ async def relatorio_financeiro(
 
 # ==================== Helper Functions ====================
 
+# Running total on Caixa fed by each transaction type, and by each payment
+# method for sales
+TOTAL_POR_TIPO = {
+    TransactionType.VENDA.value: "total_vendas",
+    TransactionType.SANGRIA.value: "total_sangrias",
+    TransactionType.SUPRIMENTO.value: "total_suprimentos",
+    TransactionType.TROCO.value: "total_suprimentos",
+}
+TOTAL_POR_PAGAMENTO = {
+    "DINHEIRO": "total_dinheiro",
+    "CARTAO": "total_cartao",
+    "PIX": "total_pix",
+    "CONVENIO": "total_convenio",
+}
+CAIXA_TOTAIS = sorted(set(TOTAL_POR_TIPO.values()) | set(TOTAL_POR_PAGAMENTO.values()))
+
+
+def _add_to_caixa_totals(db: Session, caixa: Caixa, transacao: TransacaoCaixa):
+    """Add a new transaction to its register's running totals"""
+    if caixa.transacoes_count is None:
+        # Opened before running totals existed; summaries aggregate instead
+        return
+    
+    colunas = [TOTAL_POR_TIPO[transacao.tipo]]
+    if transacao.tipo == TransactionType.VENDA.value and transacao.forma_pagamento in TOTAL_POR_PAGAMENTO:
+        colunas.append(TOTAL_POR_PAGAMENTO[transacao.forma_pagamento])
+    
+    # Incremented in SQL so concurrent transactions cannot lose an update;
+    # it is flushed and committed together with the transaction row
+    valores = {getattr(Caixa, coluna): getattr(Caixa, coluna) + transacao.valor for coluna in colunas}
+    valores[Caixa.transacoes_count] = Caixa.transacoes_count + 1
+    db.query(Caixa).filter(Caixa.id == caixa.id).update(valores, synchronize_session=False)
+    db.expire(caixa, colunas + ["transacoes_count"])
+
+
 def _calculate_caixa_summary(caixa: Caixa, db: Session) -> dict:
     """Calculate cash register summary"""
-    transacoes = db.query(TransacaoCaixa).filter(
-        TransacaoCaixa.caixa_id == caixa.id
-    ).all()
-    
-    total_vendas = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.VENDA.value)
-    total_sangrias = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.SANGRIA.value)
-    total_suprimentos = sum(float(t.valor) for t in transacoes if t.tipo in [TransactionType.SUPRIMENTO.value, TransactionType.TROCO.value])
-    
-    # Sales by payment method
-    vendas_dinheiro = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.VENDA.value and t.forma_pagamento == "DINHEIRO")
-    vendas_cartao = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.VENDA.value and t.forma_pagamento == "CARTAO")
-    vendas_pix = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.VENDA.value and t.forma_pagamento == "PIX")
-    vendas_convenio = sum(float(t.valor) for t in transacoes if t.tipo == TransactionType.VENDA.value and t.forma_pagamento == "CONVENIO")
+    if caixa.transacoes_count is not None:
+        # Read the running totals kept on the register row
+        total_vendas = float(caixa.total_vendas)
+        total_sangrias = float(caixa.total_sangrias)
+        total_suprimentos = float(caixa.total_suprimentos)
+        transacoes_count = caixa.transacoes_count
+        vendas_por_pagamento = {
+            forma_pagamento: float(getattr(caixa, coluna))
+            for forma_pagamento, coluna in TOTAL_POR_PAGAMENTO.items()
+        }
+    else:
+        rows = db.execute(_caixa_summary_rows, {"caixa_id": caixa.id}).all()
+        
+        total_vendas = 0.0
+        total_sangrias = 0.0
+        total_suprimentos = 0.0
+        transacoes_count = 0
+        
+        # Sales by payment method
+        vendas_por_pagamento = {"DINHEIRO": 0.0, "CARTAO": 0.0, "PIX": 0.0, "CONVENIO": 0.0}
+        
+        for tipo, forma_pagamento, valor, count in rows:
+            transacoes_count += count
+            
+            if tipo == TransactionType.VENDA.value:
+                total_vendas += valor
+                if forma_pagamento in vendas_por_pagamento:
+                    vendas_por_pagamento[forma_pagamento] += valor
+            elif tipo == TransactionType.SANGRIA.value:
+                total_sangrias += valor
+            elif tipo in (TransactionType.SUPRIMENTO.value, TransactionType.TROCO.value):
+                total_suprimentos += valor
     
     # Expected value in cash drawer = opening + cash sales + additions - withdrawals
     # Note: Convenio doesn't count as cash
-    valor_esperado = float(caixa.valor_abertura or 0) + vendas_dinheiro + total_suprimentos - total_sangrias
+    valor_esperado = float(caixa.valor_abertura or 0) + vendas_por_pagamento["DINHEIRO"] + total_suprimentos - total_sangrias
     
     return {
         "total_vendas": total_vendas,
         "total_sangrias": total_sangrias,
         "total_suprimentos": total_suprimentos,
         "valor_esperado": round(valor_esperado, 2),
-        "transacoes_count": len(transacoes),
-        "vendas_dinheiro": vendas_dinheiro,
-        "vendas_cartao": vendas_cartao,
-        "vendas_pix": vendas_pix,
-        "vendas_convenio": vendas_convenio
+        "transacoes_count": transacoes_count,
+        "vendas_dinheiro": vendas_por_pagamento["DINHEIRO"],
+        "vendas_cartao": vendas_por_pagamento["CARTAO"],
+        "vendas_pix": vendas_por_pagamento["PIX"],
+        "vendas_convenio": vendas_por_pagamento["CONVENIO"]
     }
 
 
 def _format_caixa_response(caixa: Caixa, db: Session) -> CaixaResponse:
     """Format cash register response"""
-    summary = _calculate_caixa_summary(caixa, db)
-    
-    usuario_abertura = db.query(Usuario).filter(Usuario.id == caixa.usuario_abertura_id).first() if caixa.usuario_abertura_id else None
-    usuario_fechamento = db.query(Usuario).filter(Usuario.id == caixa.usuario_fechamento_id).first() if caixa.usuario_fechamento_id else None
+    if caixa.status == CaixaStatus.FECHADO.value and caixa.total_vendas is not None:
+        # Closed registers keep the totals computed when they were closed
+        summary = {
+            "valor_esperado": float(caixa.valor_esperado or 0),
+            "total_vendas": float(caixa.total_vendas),
+            "vendas_dinheiro": float(caixa.total_dinheiro or 0),
+            "vendas_cartao": float(caixa.total_cartao or 0),
+            "vendas_pix": float(caixa.total_pix or 0),
+            "vendas_convenio": float(caixa.total_convenio or 0)
+        }
+    else:
+        summary = _calculate_caixa_summary(caixa, db)
     
     return CaixaResponse(
         id=caixa.id,
@@ -412,9 +537,9 @@ def _format_caixa_response(caixa: Caixa, db: Session) -> CaixaResponse:
         valor_esperado=float(caixa.valor_esperado) if caixa.valor_esperado else summary["valor_esperado"],
         diferenca=float(caixa.diferenca) if caixa.diferenca else None,
         usuario_abertura_id=caixa.usuario_abertura_id,
-        usuario_abertura_nome=usuario_abertura.nome_completo if usuario_abertura else None,
+        usuario_abertura_nome=caixa.usuario_abertura.nome if caixa.usuario_abertura else None,
         usuario_fechamento_id=caixa.usuario_fechamento_id,
-        usuario_fechamento_nome=usuario_fechamento.nome_completo if usuario_fechamento else None,
+        usuario_fechamento_nome=caixa.usuario_fechamento.nome if caixa.usuario_fechamento else None,
         aberto_em=caixa.aberto_em,
         fechado_em=caixa.fechado_em,
         observacoes=caixa.observacoes,
@@ -426,11 +551,8 @@ def _format_caixa_response(caixa: Caixa, db: Session) -> CaixaResponse:
     )
 
 
-def _format_transacao_response(transacao: TransacaoCaixa, db: Session) -> TransacaoResponse:
+def _format_transacao_response(transacao: TransacaoCaixa) -> TransacaoResponse:
     """Format transaction response"""
-    usuario = db.query(Usuario).filter(Usuario.id == transacao.usuario_id).first() if transacao.usuario_id else None
-    pedido = db.query(Pedido).filter(Pedido.id == transacao.pedido_id).first() if transacao.pedido_id else None
-    
     return TransacaoResponse(
         id=transacao.id,
         caixa_id=transacao.caixa_id,
@@ -438,9 +560,9 @@ def _format_transacao_response(transacao: TransacaoCaixa, db: Session) -> Transa
         valor=float(transacao.valor),
         forma_pagamento=transacao.forma_pagamento,
         pedido_id=transacao.pedido_id,
-        pedido_numero=pedido.numero if pedido else None,
+        pedido_numero=transacao.pedido.numero if transacao.pedido else None,
         descricao=transacao.descricao,
         usuario_id=transacao.usuario_id,
-        usuario_nome=usuario.nome_completo if usuario else None,
+        usuario_nome=transacao.usuario.nome if transacao.usuario else None,
         criado_em=transacao.criado_em
     )
@@ -3,24 +3,67 @@ LANCH - Competencias (Monthly Closing) Router
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, case, cast, exists, Float
+from typing import List, Optional, Tuple
 from datetime import datetime
 import io
+import time
 
-from database import get_db
-from models import Competencia, ConsumoMensal, Funcionario, Pedido, Usuario
+from database import get_db, SessionLocal
+from models import Competencia, ConsumoMensal, Funcionario, Pedido, Usuario, Setor
 from schemas import CompetenciaFechamento
 from routers.auth import get_current_user, require_admin
+from routers.funcionarios import invalidate_busca_cache
 from utils.audit import log_action
-from services.export_service import export_to_excel, export_to_csv
+from services.export_service import export_to_excel, iter_csv
 
 router = APIRouter(prefix="/competencias", tags=["Competências"])
 
+# Rows fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 1000
+
+# (expiry, to_dict()) of the open competency, read by every order and POS
+# lookup without a query while fresh. Creating or closing a competency here
+# drops it; a close made by another worker is only seen once the TTL runs
+# out. Employee orders confirm the competency is open in their consumption
+# upsert, so only visitor orders can still land in a competency closed by
+# another worker within the last COMPETENCIA_ABERTA_TTL seconds.
+COMPETENCIA_ABERTA_TTL = 10
+_competencia_aberta: Optional[Tuple[float, dict]] = None
+
+
+def get_competencia_aberta(db: Session) -> Optional[dict]:
+    """Open competency as to_dict(), or None if there is none"""
+    global _competencia_aberta
+    cached = _competencia_aberta
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    
+    competencia = db.query(Competencia).filter(Competencia.status == "ABERTA").first()
+    dados = competencia.to_dict() if competencia else None
+    _competencia_aberta = (
+        (time.monotonic() + COMPETENCIA_ABERTA_TTL, dados)
+        if dados is not None else None
+    )
+    return dados
+
+
+def get_competencia_aberta_id(db: Session) -> Optional[int]:
+    """Id of the open competency, or None if there is none"""
+    competencia = get_competencia_aberta(db)
+    return competencia["id"] if competencia else None
+
+
+def invalidate_competencia_aberta():
+    """Forget the cached open competency"""
+    global _competencia_aberta
+    _competencia_aberta = None
+
 
 @router.get("", response_model=List[dict])
-async def listar_competencias(
+def listar_competencias(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -29,29 +72,31 @@ async def listar_competencias(
         Competencia.ano.desc(), Competencia.mes.desc()
     ).all()
     
+    # Consumption totals for every competency in one grouped query
+    totais = {
+        competencia_id: (valor_total, total_funcionarios)
+        for competencia_id, valor_total, total_funcionarios in db.query(
+            ConsumoMensal.competencia_id,
+            func.sum(ConsumoMensal.valor_total),
+            func.sum(case((ConsumoMensal.valor_total > 0, 1), else_=0))
+        ).group_by(ConsumoMensal.competencia_id).all()
+    }
+    
     result = []
     for c in competencias:
-        # Get consumption totals
-        consumo_total = db.query(func.sum(ConsumoMensal.valor_total)).filter(
-            ConsumoMensal.competencia_id == c.id
-        ).scalar() or 0
-        
-        total_funcionarios = db.query(ConsumoMensal).filter(
-            ConsumoMensal.competencia_id == c.id,
-            ConsumoMensal.valor_total > 0
-        ).count()
+        consumo_total, total_funcionarios = totais.get(c.id, (0, 0))
         
         result.append({
             **c.to_dict(),
-            "valor_total": float(consumo_total),
-            "total_funcionarios": total_funcionarios
+            "valor_total": float(consumo_total or 0),
+            "total_funcionarios": total_funcionarios or 0
         })
     
     return result
 
 
 @router.get("/atual", response_model=dict)
-async def obter_competencia_atual(
+def obter_competencia_atual(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -64,21 +109,41 @@ async def obter_competencia_atual(
         raise HTTPException(status_code=404, detail="Não há competência aberta")
     
     # Get summary
-    consumos = db.query(ConsumoMensal).filter(
+    valor_total, total_funcionarios = db.query(
+        func.sum(ConsumoMensal.valor_total),
+        func.sum(case((ConsumoMensal.valor_total > 0, 1), else_=0))
+    ).filter(
         ConsumoMensal.competencia_id == competencia.id
-    ).all()
-    
-    valor_total = sum(float(c.valor_total) for c in consumos)
+    ).one()
     
     return {
         **competencia.to_dict(),
-        "valor_total": valor_total,
-        "total_funcionarios": len([c for c in consumos if c.valor_total > 0])
+        "valor_total": float(valor_total or 0),
+        "total_funcionarios": total_funcionarios or 0
     }
 
 
+def _consumo_rows(db: Session, competencia_id: int):
+    """Query of a competency's non-zero consumption as plain tuples"""
+    return db.query(
+        ConsumoMensal.funcionario_id,
+        Funcionario.matricula,
+        Funcionario.nome,
+        func.coalesce(Setor.nome, Funcionario.setor_nome).label("setor"),
+        func.coalesce(Setor.centro_custo, Funcionario.centro_custo).label("centro_custo"),
+        cast(ConsumoMensal.valor_total, Float).label("valor_total")
+    ).select_from(ConsumoMensal).join(
+        Funcionario, ConsumoMensal.funcionario_id == Funcionario.id
+    ).outerjoin(
+        Setor, Funcionario.setor_id == Setor.id
+    ).filter(
+        ConsumoMensal.competencia_id == competencia_id,
+        ConsumoMensal.valor_total > 0
+    ).order_by(Funcionario.nome)
+
+
 @router.get("/{competencia_id}/consumos")
-async def listar_consumos_competencia(
+def listar_consumos_competencia(
     competencia_id: int,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -88,31 +153,27 @@ async def listar_consumos_competencia(
     if not competencia:
         raise HTTPException(status_code=404, detail="Competência não encontrada")
     
-    consumos = db.query(ConsumoMensal).filter(
-        ConsumoMensal.competencia_id == competencia_id
-    ).join(Funcionario).order_by(Funcionario.nome).all()
+    # Every row also carries the grand total as a window sum
+    rows = _consumo_rows(db, competencia_id).add_columns(
+        func.sum(cast(ConsumoMensal.valor_total, Float)).over().label("total_geral")
+    ).all()
     
-    result = []
-    for c in consumos:
-        if c.valor_total > 0:
-            result.append({
-                "funcionario_id": c.funcionario_id,
-                "matricula": c.funcionario.matricula,
-                "nome": c.funcionario.nome,
-                "setor": c.funcionario.setor,
-                "centro_custo": c.funcionario.centro_custo,
-                "valor_total": float(c.valor_total)
-            })
+    campos = rows[0]._fields[:-1] if rows else ()
     
     return {
         "competencia": competencia.to_dict(),
-        "consumos": result,
-        "total_geral": sum(item["valor_total"] for item in result)
+        "consumos": [dict(zip(campos, row)) for row in rows],
+        "total_geral": rows[0].total_geral if rows else 0
     }
 
 
+def _next_competencia(ano: int, mes: int) -> Tuple[int, int]:
+    """Year and month following the given competency"""
+    return ano + mes // 12, mes % 12 + 1
+
+
 @router.post("/nova")
-async def criar_competencia(
+def criar_competencia(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
 ):
@@ -123,39 +184,35 @@ async def criar_competencia(
     ).first()
     
     if ultima:
-        if ultima.mes == 12:
-            novo_ano = ultima.ano + 1
-            novo_mes = 1
-        else:
-            novo_ano = ultima.ano
-            novo_mes = ultima.mes + 1
+        novo_ano, novo_mes = _next_competencia(ultima.ano, ultima.mes)
     else:
         now = datetime.now()
         novo_ano = now.year
         novo_mes = now.month
     
     # Check if already exists
-    existing = db.query(Competencia).filter(
+    existing = db.query(exists().where(
         Competencia.ano == novo_ano,
         Competencia.mes == novo_mes
-    ).first()
+    )).scalar()
     
     if existing:
         raise HTTPException(status_code=400, detail="Competência já existe")
     
     nova = Competencia(ano=novo_ano, mes=novo_mes, status="ABERTA")
     db.add(nova)
-    db.commit()
-    db.refresh(nova)
+    db.flush()
     
-    log_action(db, current_user.id, "CRIAR", "competencias", nova.id, None, nova.to_dict())
+    log_action(db, current_user, "CRIAR", "competencias", nova.id, None, nova.to_dict())
     db.commit()
+    invalidate_competencia_aberta()
+    invalidate_busca_cache()
     
     return nova.to_dict()
 
 
 @router.post("/{competencia_id}/fechar")
-async def fechar_competencia(
+def fechar_competencia(
     competencia_id: int,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -174,18 +231,10 @@ async def fechar_competencia(
     competencia.fechada_em = datetime.now()
     competencia.fechada_por = current_user.id
     
-    db.commit()
-    
-    log_action(db, current_user.id, "FECHAR", "competencias", competencia.id, dados_anteriores, competencia.to_dict())
-    db.commit()
+    log_action(db, current_user, "FECHAR", "competencias", competencia.id, dados_anteriores, competencia.to_dict())
     
     # Auto create next competency
-    if competencia.mes == 12:
-        prox_ano = competencia.ano + 1
-        prox_mes = 1
-    else:
-        prox_ano = competencia.ano
-        prox_mes = competencia.mes + 1
+    prox_ano, prox_mes = _next_competencia(competencia.ano, competencia.mes)
     
     prox_comp = db.query(Competencia).filter(
         Competencia.ano == prox_ano,
@@ -195,7 +244,13 @@ async def fechar_competencia(
     if not prox_comp:
         prox_comp = Competencia(ano=prox_ano, mes=prox_mes, status="ABERTA")
         db.add(prox_comp)
-        db.commit()
+    
+    # Closing and opening the next one commit together
+    db.commit()
+    invalidate_competencia_aberta()
+    
+    # Lookups report the open competency and its balance
+    invalidate_busca_cache()
     
     return {
         "message": "Competência fechada com sucesso",
@@ -205,7 +260,7 @@ async def fechar_competencia(
 
 
 @router.get("/{competencia_id}/export/excel")
-async def exportar_excel(
+def exportar_excel(
     competencia_id: int,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -215,25 +270,10 @@ async def exportar_excel(
     if not competencia:
         raise HTTPException(status_code=404, detail="Competência não encontrada")
     
-    consumos = db.query(ConsumoMensal).filter(
-        ConsumoMensal.competencia_id == competencia_id,
-        ConsumoMensal.valor_total > 0
-    ).join(Funcionario).order_by(Funcionario.nome).all()
-    
-    # Build data
-    data = []
-    for c in consumos:
-        data.append({
-            "matricula": c.funcionario.matricula,
-            "nome": c.funcionario.nome,
-            "setor": c.funcionario.setor,
-            "centro_custo": c.funcionario.centro_custo,
-            "valor_total": float(c.valor_total),
-            "competencia": f"{competencia.mes:02d}/{competencia.ano}"
-        })
+    rows = _consumo_rows(db, competencia_id).yield_per(EXPORT_BATCH_SIZE)
     
     # Generate Excel
-    excel_buffer = export_to_excel(data, competencia)
+    excel_buffer = export_to_excel(rows, competencia)
     
     filename = f"desconto_folha_{competencia.mes:02d}_{competencia.ano}.xlsx"
     
@@ -245,7 +285,7 @@ async def exportar_excel(
 
 
 @router.get("/{competencia_id}/export/csv")
-async def exportar_csv(
+def exportar_csv(
     competencia_id: int,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_admin)
@@ -255,30 +295,20 @@ async def exportar_csv(
     if not competencia:
         raise HTTPException(status_code=404, detail="Competência não encontrada")
     
-    consumos = db.query(ConsumoMensal).filter(
-        ConsumoMensal.competencia_id == competencia_id,
-        ConsumoMensal.valor_total > 0
-    ).join(Funcionario).order_by(Funcionario.nome).all()
-    
-    # Build data
-    data = []
-    for c in consumos:
-        data.append({
-            "matricula": c.funcionario.matricula,
-            "nome": c.funcionario.nome,
-            "setor": c.funcionario.setor,
-            "centro_custo": c.funcionario.centro_custo,
-            "valor_total": float(c.valor_total),
-            "competencia": f"{competencia.mes:02d}/{competencia.ano}"
-        })
-    
-    # Generate CSV
-    csv_content = export_to_csv(data, competencia)
-    
     filename = f"desconto_folha_{competencia.mes:02d}_{competencia.ano}.csv"
     
-    return Response(
-        content=csv_content,
+    # The request session is closed before the body is streamed, so the
+    # rows are read through a session owned by the generator
+    def gerar_csv():
+        export_db = SessionLocal()
+        try:
+            rows = _consumo_rows(export_db, competencia_id).yield_per(EXPORT_BATCH_SIZE)
+            yield from iter_csv(rows, competencia)
+        finally:
+            export_db.close()
+    
+    return StreamingResponse(
+        gerar_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
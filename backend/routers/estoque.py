@@ -5,13 +5,15 @@ API endpoints for stock control
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select
 from typing import List, Optional
+from cachetools import TTLCache
+from threading import Lock
 from datetime import datetime, timedelta
 
 from database import get_db
-from models import Usuario, Produto
-from models.estoque import StockMovement
+from models import Usuario, Produto, Categoria
+from models.estoque import StockMovement, MovementType
 from schemas.estoque import (
     StockMovementCreate, StockMovementResponse,
     StockAdjustment, StockAlert, StockSummary, MovementType
@@ -20,8 +22,40 @@ from routers.auth import require_admin, get_current_user
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
+
+# Movement listings read plain rows with the product and user names joined
+# in, shaped like StockMovementResponse; no ORM objects are built
+MOVEMENT_ROWS = select(
+    StockMovement.id,
+    StockMovement.produto_id,
+    Produto.nome.label("produto_nome"),
+    StockMovement.tipo,
+    StockMovement.quantidade,
+    StockMovement.quantidade_anterior,
+    StockMovement.quantidade_nova,
+    StockMovement.motivo,
+    StockMovement.referencia,
+    StockMovement.usuario_id,
+    Usuario.nome.label("usuario_nome"),
+    StockMovement.criado_em
+).outerjoin(
+    Produto, StockMovement.produto_id == Produto.id
+).outerjoin(
+    Usuario, StockMovement.usuario_id == Usuario.id
+)
 router = APIRouter(prefix="/estoque", tags=["Estoque"])
 
+# Low-stock alerts polled by dashboards; stock and product writes drop it.
+# Requests run on threadpool threads and TTLCache is not thread safe
+_alertas_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+_alertas_cache_lock = Lock()
+
+
+def invalidate_alertas_cache():
+    """Drop the cached stock alerts"""
+    with _alertas_cache_lock:
+        _alertas_cache.clear()
+
 
 @router.post("/entrada", response_model=StockMovementResponse)
 async def registrar_entrada(
@@ -58,14 +92,17 @@ async def registrar_entrada(
     # Update product stock
     produto.estoque_atual = quantidade_nova
     
+    # The response is built before the commit, so nothing is reloaded after it
     db.add(stock_movement)
+    db.flush()
+    response = _format_movement_response(stock_movement)
     db.commit()
-    db.refresh(stock_movement)
+    invalidate_alertas_cache()
     
-    logger.info(f"Stock entry: +{movement.quantidade} for product {produto.nome}", 
-                extra={"user_id": current_user.id, "product_id": produto.id})
+    logger.info(f"Stock entry: +{movement.quantidade} for product {response.produto_nome}", 
+                extra={"user_id": response.usuario_id, "product_id": response.produto_id})
     
-    return _format_movement_response(stock_movement, db)
+    return response
 
 
 @router.post("/saida", response_model=StockMovementResponse)
@@ -106,14 +143,17 @@ async def registrar_saida(
     
     produto.estoque_atual = quantidade_nova
     
+    # The response is built before the commit, so nothing is reloaded after it
     db.add(stock_movement)
+    db.flush()
+    response = _format_movement_response(stock_movement)
     db.commit()
-    db.refresh(stock_movement)
+    invalidate_alertas_cache()
     
-    logger.info(f"Stock exit: -{movement.quantidade} for product {produto.nome}",
-                extra={"user_id": current_user.id, "product_id": produto.id})
+    logger.info(f"Stock exit: -{movement.quantidade} for product {response.produto_nome}",
+                extra={"user_id": response.usuario_id, "product_id": response.produto_id})
     
-    return _format_movement_response(stock_movement, db)
+    return response
 
 
 @router.post("/ajuste", response_model=StockMovementResponse)
@@ -153,14 +193,17 @@ async def ajustar_estoque(
     
     produto.estoque_atual = adjustment.nova_quantidade
     
+    # The response is built before the commit, so nothing is reloaded after it
     db.add(stock_movement)
+    db.flush()
+    response = _format_movement_response(stock_movement)
     db.commit()
-    db.refresh(stock_movement)
+    invalidate_alertas_cache()
     
-    logger.info(f"Stock adjustment: {quantidade_anterior} -> {adjustment.nova_quantidade} for product {produto.nome}",
-                extra={"user_id": current_user.id, "product_id": produto.id})
+    logger.info(f"Stock adjustment: {quantidade_anterior} -> {adjustment.nova_quantidade} for product {response.produto_nome}",
+                extra={"user_id": response.usuario_id, "product_id": response.produto_id})
     
-    return _format_movement_response(stock_movement, db)
+    return response
 
 
 @router.get("/movimentacoes", response_model=List[StockMovementResponse])
@@ -169,25 +212,35 @@ async def listar_movimentacoes(
     tipo: Optional[str] = None,
     dias: int = Query(default=30, ge=1, le=365),
     limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     List stock movements with filtering options
+    
+    Pages are keyset based: pass the id of the last movement received as
+    ``cursor`` to get the older ones that follow it.
     """
     data_inicio = datetime.utcnow() - timedelta(days=dias)
     
-    query = db.query(StockMovement).filter(StockMovement.criado_em >= data_inicio)
+    stmt = MOVEMENT_ROWS.where(StockMovement.criado_em >= data_inicio)
     
     if produto_id:
-        query = query.filter(StockMovement.produto_id == produto_id)
+        stmt = stmt.where(StockMovement.produto_id == produto_id)
     
     if tipo:
-        query = query.filter(StockMovement.tipo == tipo.upper())
+        # Unknown types have no integer code and can never match
+        if tipo.upper() not in MovementType.__members__:
+            return []
+        stmt = stmt.where(StockMovement.tipo == tipo.upper())
     
-    movements = query.order_by(StockMovement.criado_em.desc()).limit(limit).all()
+    if cursor:
+        # Ids grow with criado_em, so this continues the newest-first order
+        stmt = stmt.where(StockMovement.id < cursor)
     
-    return [_format_movement_response(m, db) for m in movements]
+    stmt = stmt.order_by(StockMovement.criado_em.desc(), StockMovement.id.desc()).limit(limit)
+    return db.execute(stmt).mappings().all()
 
 
 @router.get("/alertas", response_model=List[StockAlert])
@@ -198,17 +251,32 @@ async def listar_alertas(
     """
     List products below minimum stock level
     """
-    from models import Categoria
-    
-    produtos = db.query(Produto).filter(
+    with _alertas_cache_lock:
+        cached = _alertas_cache.get("alertas")
+    if cached is not None:
+        return cached
+    
+    # Category names come from the same query
+    produtos = db.query(
+        Produto.id,
+        Produto.nome,
+        Produto.estoque_atual,
+        Produto.estoque_minimo,
+        Categoria.nome.label("categoria_nome")
+    ).outerjoin(
+        Categoria, Produto.categoria_id == Categoria.id
+    ).filter(
         Produto.controlar_estoque == True,
         Produto.ativo == True,
         Produto.estoque_atual <= Produto.estoque_minimo
+    ).order_by(
+        # Most critical first: out of stock, then by deficit
+        (Produto.estoque_atual == 0).desc(),
+        (Produto.estoque_minimo - Produto.estoque_atual).desc()
     ).all()
     
     alertas = []
     for p in produtos:
-        categoria = db.query(Categoria).filter(Categoria.id == p.categoria_id).first()
         deficit = p.estoque_minimo - p.estoque_atual
         
         if p.estoque_atual == 0:
@@ -221,15 +289,15 @@ async def listar_alertas(
         alertas.append(StockAlert(
             produto_id=p.id,
             produto_nome=p.nome,
-            categoria_nome=categoria.nome if categoria else None,
+            categoria_nome=p.categoria_nome,
             estoque_atual=p.estoque_atual,
             estoque_minimo=p.estoque_minimo,
             deficit=deficit,
             status=status
         ))
     
-    # Sort by deficit (most critical first)
-    alertas.sort(key=lambda x: (-1 if x.status == "CRITICAL" else 0, -x.deficit))
+    with _alertas_cache_lock:
+        _alertas_cache["alertas"] = alertas
     
     return alertas
 
@@ -242,39 +310,29 @@ async def resumo_estoque(
     """
     Get stock summary with alerts and recent movements
     """
-    # Total products with stock control
-    total_produtos = db.query(Produto).filter(
+    # Products with stock control, below minimum and with zero stock in one pass
+    contagem = db.query(
+        func.count().label("total"),
+        func.sum(case((Produto.estoque_atual < Produto.estoque_minimo, 1), else_=0)).label("abaixo"),
+        func.sum(case((Produto.estoque_atual == 0, 1), else_=0)).label("zerados")
+    ).filter(
         Produto.controlar_estoque == True,
         Produto.ativo == True
-    ).count()
-    
-    # Products below minimum
-    produtos_abaixo = db.query(Produto).filter(
-        Produto.controlar_estoque == True,
-        Produto.ativo == True,
-        Produto.estoque_atual < Produto.estoque_minimo
-    ).count()
-    
-    # Products with zero stock
-    produtos_zerados = db.query(Produto).filter(
-        Produto.controlar_estoque == True,
-        Produto.ativo == True,
-        Produto.estoque_atual == 0
-    ).count()
+    ).one()
     
     # Last 10 movements
-    ultimas = db.query(StockMovement).order_by(
-        StockMovement.criado_em.desc()
-    ).limit(10).all()
+    ultimas = db.execute(
+        MOVEMENT_ROWS.order_by(StockMovement.criado_em.desc()).limit(10)
+    ).mappings().all()
     
     # Get alerts
     alertas_response = await listar_alertas(db, current_user)
     
     return StockSummary(
-        total_produtos=total_produtos,
-        produtos_abaixo_minimo=produtos_abaixo,
-        produtos_zerados=produtos_zerados,
-        ultimas_movimentacoes=[_format_movement_response(m, db) for m in ultimas],
+        total_produtos=contagem.total,
+        produtos_abaixo_minimo=contagem.abaixo or 0,
+        produtos_zerados=contagem.zerados or 0,
+        ultimas_movimentacoes=ultimas,
         alertas=alertas_response[:10]
     )
 
@@ -302,6 +360,7 @@ async def atualizar_limites_estoque(
     produto.controlar_estoque = True
     
     db.commit()
+    invalidate_alertas_cache()
     
     return {
         "message": "Limites de estoque atualizados",
@@ -311,10 +370,15 @@ async def atualizar_limites_estoque(
     }
 
 
-def _format_movement_response(movement: StockMovement, db: Session) -> StockMovementResponse:
-    """Helper to format movement response with related names"""
-    produto = db.query(Produto).filter(Produto.id == movement.produto_id).first()
-    usuario = db.query(Usuario).filter(Usuario.id == movement.usuario_id).first() if movement.usuario_id else None
+def _format_movement_response(movement: StockMovement) -> StockMovementResponse:
+    """
+    Helper to format movement response with related names
+    
+    Used right after a write, when the product and user are already in the
+    session, so no query is needed.
+    """
+    produto = movement.produto
+    usuario = movement.usuario
     
     return StockMovementResponse(
         id=movement.id,
@@ -327,6 +391,6 @@ def _format_movement_response(movement: StockMovement, db: Session) -> StockMove
         motivo=movement.motivo,
         referencia=movement.referencia,
         usuario_id=movement.usuario_id,
-        usuario_nome=usuario.nome_completo if usuario else None,
+        usuario_nome=usuario.nome if usuario else None,
         criado_em=movement.criado_em
     )
@@ -3,8 +3,12 @@ LANCH - Employees Router
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import exists
+from typing import List, Optional
+from decimal import Decimal
+from cachetools import TTLCache
+from threading import Lock
 
 from database import get_db
 from models import Funcionario, Competencia, ConsumoMensal, Usuario
@@ -12,10 +16,37 @@ from schemas import (
     FuncionarioCreate, FuncionarioUpdate, FuncionarioResponse, FuncionarioConsumo
 )
 from routers.auth import get_current_user, require_admin, require_atendente
-from utils.audit import log_action
+from utils.audit import log_action, snapshot
 
 router = APIRouter(prefix="/funcionarios", tags=["Funcionários"])
 
+# POS lookup responses keyed by ("matricula", value) or ("cpf", value). Writes
+# that change an employee, their balance or the open competency drop entries.
+# Lookups run on threadpool threads and TTLCache is not thread safe
+_busca_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+_busca_cache_lock = Lock()
+
+
+# Every byte except the ASCII digits, deleted by bytes.translate in one pass
+_NON_DIGITS = bytes(c for c in range(256) if not 0x30 <= c <= 0x39)
+
+
+def _only_digits(value: str) -> str:
+    """Strip CPF punctuation, keeping only the digits"""
+    if value.isascii():
+        return value.encode().translate(None, _NON_DIGITS).decode()
+    return ''.join(filter(str.isdigit, value))
+
+
+def invalidate_busca_cache(funcionario_id: Optional[int] = None):
+    """Drop cached lookups of one employee, or all of them"""
+    with _busca_cache_lock:
+        if funcionario_id is None:
+            _busca_cache.clear()
+            return
+        for key in [key for key, entry in _busca_cache.items() if entry["id"] == funcionario_id]:
+            _busca_cache.pop(key, None)
+
 
 @router.get("", response_model=List[FuncionarioResponse])
 async def listar_funcionarios(
@@ -25,7 +56,7 @@ async def listar_funcionarios(
     current_user: Usuario = Depends(get_current_user)
 ):
     """List all employees with optional filters"""
-    query = db.query(Funcionario)
+    query = db.query(Funcionario).options(joinedload(Funcionario.setor))
     
     if ativo is not None:
         query = query.filter(Funcionario.ativo == ativo)
@@ -49,14 +80,23 @@ async def buscar_funcionario(
             detail="Informe matrícula ou CPF"
         )
     
-    query = db.query(Funcionario)
+    if matricula:
+        cache_key = ("matricula", matricula)
+    else:
+        # Clean CPF
+        cache_key = ("cpf", _only_digits(cpf))
+    
+    with _busca_cache_lock:
+        cached = _busca_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    query = db.query(Funcionario).options(joinedload(Funcionario.setor))
     
     if matricula:
         funcionario = query.filter(Funcionario.matricula == matricula).first()
     else:
-        # Clean CPF
-        cpf_clean = ''.join(filter(str.isdigit, cpf))
-        funcionario = query.filter(Funcionario.cpf == cpf_clean).first()
+        funcionario = query.filter(Funcionario.cpf == cache_key[1]).first()
     
     if not funcionario:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
@@ -67,26 +107,31 @@ async def buscar_funcionario(
             detail="Funcionário inativo. Consumo bloqueado."
         )
     
-    # Get current consumption
-    competencia = db.query(Competencia).filter(Competencia.status == "ABERTA").first()
+    # Get current consumption (competencias imports this module)
+    from routers.competencias import get_competencia_aberta
+    competencia = get_competencia_aberta(db)
     
-    valor_consumido = 0.0
+    valor_consumido = Decimal(0)
     if competencia:
-        consumo = db.query(ConsumoMensal).filter(
+        consumo = db.query(ConsumoMensal.valor_total).filter(
             ConsumoMensal.funcionario_id == funcionario.id,
-            ConsumoMensal.competencia_id == competencia.id
-        ).first()
-        if consumo:
-            valor_consumido = float(consumo.valor_total)
+            ConsumoMensal.competencia_id == competencia["id"]
+        ).scalar()
+        if consumo is not None:
+            valor_consumido = consumo
     
-    saldo = float(funcionario.limite_mensal) - valor_consumido
+    saldo = funcionario.limite_mensal - valor_consumido
     
-    return {
-        **funcionario.to_dict(),
+    resultado = {
+        **snapshot(FuncionarioResponse, funcionario),
         "valor_consumido": valor_consumido,
         "saldo_disponivel": saldo,
-        "competencia": competencia.to_dict() if competencia else None
+        "competencia": competencia
     }
+    with _busca_cache_lock:
+        _busca_cache[cache_key] = resultado
+    
+    return resultado
 
 
 @router.get("/{funcionario_id}", response_model=FuncionarioResponse)
@@ -96,7 +141,9 @@ async def obter_funcionario(
     current_user: Usuario = Depends(get_current_user)
 ):
     """Get a single employee by ID"""
-    funcionario = db.query(Funcionario).filter(Funcionario.id == funcionario_id).first()
+    funcionario = db.query(Funcionario).options(
+        joinedload(Funcionario.setor)
+    ).filter(Funcionario.id == funcionario_id).first()
     if not funcionario:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
     return funcionario
@@ -110,17 +157,12 @@ async def criar_funcionario(
 ):
     """Create a new employee"""
     # Clean CPF
-    cpf_clean = ''.join(filter(str.isdigit, funcionario.cpf))
-    
-    # Check duplicates
-    existing = db.query(Funcionario).filter(
-        (Funcionario.matricula == funcionario.matricula) |
-        (Funcionario.cpf == cpf_clean)
-    ).first()
+    cpf_clean = _only_digits(funcionario.cpf)
     
-    if existing:
-        if existing.matricula == funcionario.matricula:
-            raise HTTPException(status_code=400, detail="Matrícula já cadastrada")
+    # Check duplicates, one index probe each
+    if db.query(exists().where(Funcionario.matricula == funcionario.matricula)).scalar():
+        raise HTTPException(status_code=400, detail="Matrícula já cadastrada")
+    if db.query(exists().where(Funcionario.cpf == cpf_clean)).scalar():
         raise HTTPException(status_code=400, detail="CPF já cadastrado")
     
     func_data = funcionario.model_dump()
@@ -128,10 +170,10 @@ async def criar_funcionario(
     
     db_funcionario = Funcionario(**func_data)
     db.add(db_funcionario)
-    db.commit()
+    db.flush()
     db.refresh(db_funcionario)
     
-    log_action(db, current_user.id, "CRIAR", "funcionarios", db_funcionario.id, None, db_funcionario.to_dict())
+    log_action(db, current_user, "CRIAR", "funcionarios", db_funcionario.id, None, snapshot(FuncionarioResponse, db_funcionario))
     db.commit()
     
     return db_funcionario
@@ -149,17 +191,18 @@ async def atualizar_funcionario(
     if not db_func:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
     
-    dados_anteriores = db_func.to_dict()
+    dados_anteriores = snapshot(FuncionarioResponse, db_func)
     
     update_data = funcionario.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_func, key, value)
     
-    db.commit()
+    db.flush()
     db.refresh(db_func)
     
-    log_action(db, current_user.id, "ATUALIZAR", "funcionarios", db_func.id, dados_anteriores, db_func.to_dict())
+    log_action(db, current_user, "ATUALIZAR", "funcionarios", db_func.id, dados_anteriores, snapshot(FuncionarioResponse, db_func))
     db.commit()
+    invalidate_busca_cache(funcionario_id)
     
     return db_func
 
@@ -175,12 +218,12 @@ async def desativar_funcionario(
     if not funcionario:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
     
-    dados_anteriores = funcionario.to_dict()
+    dados_anteriores = snapshot(FuncionarioResponse, funcionario)
     funcionario.ativo = False
-    db.commit()
     
-    log_action(db, current_user.id, "DESATIVAR", "funcionarios", funcionario.id, dados_anteriores, funcionario.to_dict())
+    log_action(db, current_user, "DESATIVAR", "funcionarios", funcionario.id, dados_anteriores, snapshot(FuncionarioResponse, funcionario))
     db.commit()
+    invalidate_busca_cache(funcionario_id)
     
     return {"message": "Funcionário desativado com sucesso"}
 
@@ -201,6 +244,6 @@ async def obter_consumo_funcionario(
     ).join(Competencia).order_by(Competencia.ano.desc(), Competencia.mes.desc()).all()
     
     return {
-        "funcionario": funcionario.to_dict(),
+        "funcionario": snapshot(FuncionarioResponse, funcionario),
         "consumos": [c.to_dict() for c in consumos]
     }
@@ -3,37 +3,64 @@ LANCH - Orders Router
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, joinedload, raiseload
+from sqlalchemy import func, select, update, exists, literal, cast, case, type_coerce, Integer, String
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing import List
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 
 from database import get_db
 from models import (
     Pedido, ItemPedido, Produto, Funcionario, 
-    Competencia, ConsumoMensal, Usuario
+    Competencia, ConsumoMensal, Usuario, StatusPedido, Sequencia
 )
-from schemas import PedidoCreate, PedidoUpdate, PedidoResponse, PedidoCozinha
+from schemas import PedidoCreate, PedidoUpdate, PedidoResponse, PedidoCozinha, PedidosHoje
 from routers.auth import get_current_user, require_atendente
-from utils.audit import log_action
+from routers.competencias import get_competencia_aberta_id, invalidate_competencia_aberta
+from routers.estoque import invalidate_alertas_cache
+from routers.funcionarios import invalidate_busca_cache
+from utils.audit import log_action, snapshot
 
 router = APIRouter(prefix="/pedidos", tags=["Pedidos"])
 
+# Loads everything PedidoResponse reads; any other lazy load raises
+PEDIDO_LOAD_OPTIONS = (
+    # Items only need their own columns plus the product name
+    selectinload(Pedido.itens).load_only(
+        ItemPedido.id, ItemPedido.produto_id, ItemPedido.quantidade,
+        ItemPedido.preco_unitario, ItemPedido.subtotal
+    ).selectinload(ItemPedido.produto).load_only(Produto.id, Produto.nome),
+    joinedload(Pedido.funcionario),
+    raiseload("*"),
+)
 
-def generate_order_number(db: Session) -> str:
-    """Generate unique order number"""
+
+def generate_order_numbers(db: Session, quantidade: int = 1) -> List[str]:
+    """Generate unique order numbers from today's sequence"""
     today = datetime.now().strftime("%Y%m%d")
     
-    # Count orders today
-    count = db.query(Pedido).filter(
-        Pedido.numero.like(f"{today}%")
-    ).count()
+    # Seeds a new day's sequence from orders numbered before it existed
+    ultimo_hoje = select(
+        func.coalesce(cast(func.substr(func.max(Pedido.numero), 9), Integer), 0)
+    ).where(
+        Pedido.numero >= today,
+        Pedido.numero < str(int(today) + 1)
+    ).scalar_subquery()
     
-    return f"{today}{count + 1:04d}"
+    valores = Sequencia.reservar(db, f"pedido:{today}", quantidade, inicio=ultimo_hoje)
+    return [f"{today}{valor:04d}" for valor in valores]
+
+
+def generate_order_number(db: Session) -> str:
+    """Generate unique order number"""
+    return generate_order_numbers(db)[0]
 
 
+# Read endpoints are plain def so FastAPI runs their blocking queries on the
+# threadpool; kitchen and POS polling must not stall the event loop
 @router.get("", response_model=List[PedidoResponse])
-async def listar_pedidos(
+def listar_pedidos(
     status: str = None,
     tipo_cliente: str = None,
     data_inicio: str = None,
@@ -43,32 +70,73 @@ async def listar_pedidos(
     current_user: Usuario = Depends(get_current_user)
 ):
     """List orders with filters"""
-    query = db.query(Pedido)
+    stmt = select(
+        Pedido.id,
+        Pedido.numero,
+        Pedido.tipo_cliente,
+        Pedido.funcionario_id,
+        Funcionario.nome.label("funcionario_nome"),
+        Funcionario.matricula.label("funcionario_matricula"),
+        Pedido.valor_total,
+        Pedido.status,
+        Pedido.forma_pagamento,
+        Pedido.observacao,
+        Pedido.criado_em
+    ).outerjoin(Funcionario, Pedido.funcionario_id == Funcionario.id)
     
     if status:
-        query = query.filter(Pedido.status == status)
+        # Unknown statuses have no integer code and can never match
+        if status not in StatusPedido.__members__:
+            return []
+        stmt = stmt.where(Pedido.status == status)
     if tipo_cliente:
-        query = query.filter(Pedido.tipo_cliente == tipo_cliente)
+        stmt = stmt.where(Pedido.tipo_cliente == tipo_cliente)
     if data_inicio:
-        query = query.filter(Pedido.criado_em >= data_inicio)
+        stmt = stmt.where(Pedido.criado_em >= data_inicio)
     if data_fim:
-        query = query.filter(Pedido.criado_em <= data_fim)
+        stmt = stmt.where(Pedido.criado_em <= data_fim)
+    
+    pedidos = [
+        dict(row)
+        for row in db.execute(stmt.order_by(Pedido.criado_em.desc()).limit(limit)).mappings()
+    ]
+    if not pedidos:
+        return pedidos
+    
+    # Items for the whole page in one query
+    itens_por_pedido = {p["id"]: [] for p in pedidos}
+    itens = db.execute(
+        select(
+            ItemPedido.pedido_id,
+            ItemPedido.id,
+            ItemPedido.produto_id,
+            Produto.nome.label("produto_nome"),
+            ItemPedido.quantidade,
+            ItemPedido.preco_unitario,
+            ItemPedido.subtotal
+        )
+        .outerjoin(Produto, ItemPedido.produto_id == Produto.id)
+        .where(ItemPedido.pedido_id.in_(itens_por_pedido))
+    ).mappings()
+    for item in itens:
+        itens_por_pedido[item["pedido_id"]].append(dict(item))
     
-    pedidos = query.order_by(Pedido.criado_em.desc()).limit(limit).all()
-    return [p.to_dict() for p in pedidos]
+    for p in pedidos:
+        p["itens"] = itens_por_pedido[p["id"]]
+    return pedidos
 
 
 @router.get("/cozinha", response_model=List[dict])
-async def listar_pedidos_cozinha(
+def listar_pedidos_cozinha(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """List pending orders for kitchen display"""
-    pedidos = db.query(Pedido).filter(
+    pedidos = db.query(Pedido).options(*PEDIDO_LOAD_OPTIONS).filter(
         Pedido.status.in_(["PENDENTE", "PREPARANDO", "PRONTO"])
     ).order_by(
         # Priority: PENDENTE first, then PREPARANDO, then PRONTO
-        func.case(
+        case(
             (Pedido.status == "PENDENTE", 1),
             (Pedido.status == "PREPARANDO", 2),
             else_=3
@@ -104,44 +172,61 @@ async def listar_pedidos_cozinha(
     return result
 
 
-@router.get("/hoje")
-async def listar_pedidos_hoje(
+@router.get("/hoje", response_model=PedidosHoje)
+def listar_pedidos_hoje(
+    incluir_pedidos: bool = True,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Get today's orders summary"""
     today = datetime.now().date()
     
-    pedidos = db.query(Pedido).filter(
-        func.date(Pedido.criado_em) == today
-    ).all()
+    # Compare the stored text against date bounds so ix_pedidos_criado is
+    # usable; func.date(criado_em) would scan every order
+    criado_em = type_coerce(Pedido.criado_em, String)
+    do_dia = (
+        criado_em >= today.isoformat(),
+        criado_em < (today + timedelta(days=1)).isoformat(),
+    )
+    
+    # Counts and the non-cancelled total per client type in one query
+    totais = {
+        row.tipo_cliente: row
+        for row in db.query(
+            Pedido.tipo_cliente,
+            func.count().label("quantidade"),
+            func.sum(case(
+                (Pedido.status != StatusPedido.CANCELADO, Pedido.valor_total),
+                else_=0
+            )).label("valor")
+        ).filter(*do_dia).group_by(Pedido.tipo_cliente)
+    }
     
-    # Calculate summary
-    total_funcionarios = sum(1 for p in pedidos if p.tipo_cliente == "FUNCIONARIO")
-    total_pacientes = sum(1 for p in pedidos if p.tipo_cliente == "PACIENTE")
-    valor_total = sum(float(p.valor_total) for p in pedidos if p.status != "CANCELADO")
+    pedidos = []
+    if incluir_pedidos:
+        pedidos = db.query(Pedido).options(*PEDIDO_LOAD_OPTIONS).filter(*do_dia).all()
     
     return {
         "data": str(today),
-        "total_pedidos": len(pedidos),
-        "total_funcionarios": total_funcionarios,
-        "total_pacientes": total_pacientes,
-        "valor_total": valor_total,
-        "pedidos": [p.to_dict() for p in pedidos]
+        "total_pedidos": sum(row.quantidade for row in totais.values()),
+        "total_funcionarios": totais["FUNCIONARIO"].quantidade if "FUNCIONARIO" in totais else 0,
+        "total_pacientes": totais["PACIENTE"].quantidade if "PACIENTE" in totais else 0,
+        "valor_total": sum((Decimal(row.valor or 0) for row in totais.values()), Decimal(0)),
+        "pedidos": pedidos
     }
 
 
 @router.get("/{pedido_id}", response_model=PedidoResponse)
-async def obter_pedido(
+def obter_pedido(
     pedido_id: int,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Get a single order by ID"""
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
+    pedido = db.query(Pedido).options(*PEDIDO_LOAD_OPTIONS).filter(Pedido.id == pedido_id).first()
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido não encontrado")
-    return pedido.to_dict()
+    return pedido
 
 
 @router.post("", response_model=PedidoResponse, status_code=status.HTTP_201_CREATED)
@@ -152,8 +237,8 @@ async def criar_pedido(
 ):
     """Create a new order"""
     # Get current open competency
-    competencia = db.query(Competencia).filter(Competencia.status == "ABERTA").first()
-    if not competencia:
+    competencia_id = get_competencia_aberta_id(db)
+    if competencia_id is None:
         raise HTTPException(status_code=400, detail="Não há competência aberta")
     
     funcionario = None
@@ -194,15 +279,22 @@ async def criar_pedido(
             )
         forma_pagamento = pedido.forma_pagamento
     
-    # Calculate order total
-    valor_total = 0
+    # Calculate order total (money stays Decimal end to end)
+    valor_total = Decimal(0)
     itens_list = []
     
-    for item in pedido.itens:
-        produto = db.query(Produto).filter(
-            Produto.id == item.produto_id,
+    # Every product of the order in one query
+    produtos = {
+        p.id: p for p in db.query(Produto).filter(
+            Produto.id.in_({item.produto_id for item in pedido.itens}),
             Produto.ativo == True
-        ).first()
+        ).all()
+    }
+    # Units requested per stock-controlled product (lines may repeat one)
+    reservas = {}
+    
+    for item in pedido.itens:
+        produto = produtos.get(item.produto_id)
         
         if not produto:
             raise HTTPException(
@@ -210,35 +302,53 @@ async def criar_pedido(
                 detail=f"Produto {item.produto_id} não encontrado ou inativo"
             )
         
-        subtotal = float(produto.preco) * item.quantidade
+        subtotal = produto.preco * item.quantidade
         valor_total += subtotal
         
         itens_list.append({
             "produto": produto,
             "quantidade": item.quantidade,
-            "preco_unitario": float(produto.preco),
+            "preco_unitario": produto.preco,
             "subtotal": subtotal
         })
         
         # Check stock
         if produto.controlar_estoque:
-            if produto.estoque_atual < item.quantidade:
+            disponivel = produto.estoque_atual - reservas.get(produto.id, 0)
+            if disponivel < item.quantidade:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Estoque insuficiente para {produto.nome}. Disponível: {produto.estoque_atual}"
+                    detail=f"Estoque insuficiente para {produto.nome}. Disponível: {disponivel}"
                 )
-            # Reserve stock (will be committed with order)
-            produto.estoque_atual -= item.quantidade
+            reservas[produto.id] = reservas.get(produto.id, 0) + item.quantidade
+    
+    # Reserve stock (will be committed with order). The check above used the
+    # loaded rows; the decrement only applies while enough stock is left, so
+    # a concurrent order that got there first makes it match no row
+    for produto_id, quantidade in reservas.items():
+        reservado = db.execute(
+            update(Produto)
+            .where(Produto.id == produto_id, Produto.estoque_atual >= quantidade)
+            .values(estoque_atual=Produto.estoque_atual - quantidade)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not reservado:
+            disponivel = db.scalar(select(Produto.estoque_atual).where(Produto.id == produto_id))
+            raise HTTPException(
+                status_code=400,
+                detail=f"Estoque insuficiente para {produtos[produto_id].nome}. Disponível: {disponivel}"
+            )
+        db.expire(produtos[produto_id], ["estoque_atual"])
     
     # Check employee limit
     if funcionario:
         consumo = db.query(ConsumoMensal).filter(
             ConsumoMensal.funcionario_id == funcionario.id,
-            ConsumoMensal.competencia_id == competencia.id
+            ConsumoMensal.competencia_id == competencia_id
         ).first()
         
-        valor_atual = float(consumo.valor_total) if consumo else 0
-        saldo = float(funcionario.limite_mensal) - valor_atual
+        valor_atual = consumo.valor_total if consumo else Decimal(0)
+        saldo = funcionario.limite_mensal - valor_atual
         
         if valor_total > saldo:
             raise HTTPException(
@@ -255,65 +365,72 @@ async def criar_pedido(
         valor_total=valor_total,
         status="PENDENTE",
         forma_pagamento=forma_pagamento,
-        competencia_id=competencia.id,
+        competencia_id=competencia_id,
         observacao=pedido.observacao
     )
     db.add(db_pedido)
     db.flush()  # Get ID before adding items
     
-    # Create order items
-    for item_data in itens_list:
-        db_item = ItemPedido(
-            pedido_id=db_pedido.id,
-            produto_id=item_data["produto"].id,
-            quantidade=item_data["quantidade"],
-            preco_unitario=item_data["preco_unitario"],
-            subtotal=item_data["subtotal"]
-        )
-        db.add(db_item)
+    # Create order items with a single multi-row INSERT
+    db.bulk_insert_mappings(ItemPedido, [
+        {
+            "pedido_id": db_pedido.id,
+            "produto_id": item_data["produto"].id,
+            "quantidade": item_data["quantidade"],
+            "preco_unitario": item_data["preco_unitario"],
+            "subtotal": item_data["subtotal"]
+        }
+        for item_data in itens_list
+    ])
     
-    # Update employee consumption
+    # Add to employee consumption in one upsert, so concurrent orders of the
+    # same employee cannot overwrite each other's total. It only writes while
+    # the competency is still open, catching a close by another worker that
+    # the cached competency id has not seen yet
     if funcionario:
-        consumo = db.query(ConsumoMensal).filter(
-            ConsumoMensal.funcionario_id == funcionario.id,
-            ConsumoMensal.competencia_id == competencia.id
-        ).first()
-        
-        if consumo:
-            consumo.valor_total = float(consumo.valor_total) + valor_total
-        else:
-            consumo = ConsumoMensal(
-                funcionario_id=funcionario.id,
-                competencia_id=competencia.id,
-                valor_total=valor_total
+        aberta = select(
+            literal(funcionario.id),
+            literal(competencia_id),
+            literal(valor_total, ConsumoMensal.valor_total.type)
+        ).where(
+            exists().where(Competencia.id == competencia_id, Competencia.status == "ABERTA")
+        )
+        consumo = sqlite_insert(ConsumoMensal).from_select(
+            ["funcionario_id", "competencia_id", "valor_total"], aberta
+        )
+        registrado = db.execute(consumo.on_conflict_do_update(
+            index_elements=["funcionario_id", "competencia_id"],
+            set_={
+                "valor_total": ConsumoMensal.valor_total + consumo.excluded.valor_total,
+                "atualizado_em": func.now()
+            }
+        )).rowcount
+        if not registrado:
+            invalidate_competencia_aberta()
+            raise HTTPException(
+                status_code=400,
+                detail="A competência aberta foi fechada. Tente novamente."
             )
-            db.add(consumo)
     
-    db.commit()
+    db.flush()
     db.refresh(db_pedido)
     
-    log_action(db, current_user.id, "CRIAR", "pedidos", db_pedido.id, None, db_pedido.to_dict())
+    log_action(db, current_user, "CRIAR", "pedidos", db_pedido.id, None, snapshot(PedidoResponse, db_pedido))
     db.commit()
+    if reservas:
+        invalidate_alertas_cache()
+    if funcionario:
+        invalidate_busca_cache(funcionario.id)
     
-    return db_pedido.to_dict()
+    return db_pedido
 
 
-@router.put("/{pedido_id}/status")
-async def atualizar_status_pedido(
-    pedido_id: int,
-    novo_status: str,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
-):
-    """Update order status"""
-    valid_statuses = ["PENDENTE", "PREPARANDO", "PRONTO", "ENTREGUE", "CANCELADO"]
-    if novo_status not in valid_statuses:
-        raise HTTPException(status_code=400, detail="Status inválido")
-    
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
-    if not pedido:
-        raise HTTPException(status_code=404, detail="Pedido não encontrado")
+def _apply_status_change(db: Session, pedido: Pedido, novo_status: str, current_user: Usuario) -> dict:
+    """
+    Move an already loaded order to novo_status and commit
     
+    Cancelling also reverses the employee consumption and restores stock.
+    """
     # Check if competency is closed for cancellations
     if novo_status == "CANCELADO":
         competencia = db.query(Competencia).filter(
@@ -328,13 +445,19 @@ async def atualizar_status_pedido(
         
         # Reverse employee consumption
         if pedido.tipo_cliente == "FUNCIONARIO" and pedido.funcionario_id:
-            consumo = db.query(ConsumoMensal).filter(
-                ConsumoMensal.funcionario_id == pedido.funcionario_id,
-                ConsumoMensal.competencia_id == pedido.competencia_id
-            ).first()
-            
-            if consumo:
-                consumo.valor_total = max(0, float(consumo.valor_total) - float(pedido.valor_total))
+            db.execute(
+                update(ConsumoMensal)
+                .where(
+                    ConsumoMensal.funcionario_id == pedido.funcionario_id,
+                    ConsumoMensal.competencia_id == pedido.competencia_id
+                )
+                .values(valor_total=case(
+                    (ConsumoMensal.valor_total > pedido.valor_total,
+                     ConsumoMensal.valor_total - pedido.valor_total),
+                    else_=0
+                ))
+                .execution_options(synchronize_session=False)
+            )
         
         # Restore stock for cancelled orders
         for item in pedido.itens:
@@ -344,17 +467,40 @@ async def atualizar_status_pedido(
     
     dados_anteriores = {"status": pedido.status}
     pedido.status = novo_status
-    db.commit()
     
     log_action(
-        db, current_user.id, "ATUALIZAR_STATUS", "pedidos", 
+        db, current_user, "ATUALIZAR_STATUS", "pedidos", 
         pedido.id, dados_anteriores, {"status": novo_status}
     )
     db.commit()
     
+    if novo_status == "CANCELADO":
+        invalidate_alertas_cache()
+        if pedido.funcionario_id:
+            invalidate_busca_cache(pedido.funcionario_id)
+    
     return {"message": f"Status atualizado para {novo_status}"}
 
 
+@router.put("/{pedido_id}/status")
+async def atualizar_status_pedido(
+    pedido_id: int,
+    novo_status: str,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Update order status"""
+    valid_statuses = ["PENDENTE", "PREPARANDO", "PRONTO", "ENTREGUE", "CANCELADO"]
+    if novo_status not in valid_statuses:
+        raise HTTPException(status_code=400, detail="Status inválido")
+    
+    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
+    if not pedido:
+        raise HTTPException(status_code=404, detail="Pedido não encontrado")
+    
+    return _apply_status_change(db, pedido, novo_status, current_user)
+
+
 @router.delete("/{pedido_id}")
 async def cancelar_pedido(
     pedido_id: int,
@@ -372,5 +518,4 @@ async def cancelar_pedido(
             detail="Não é possível cancelar pedido já entregue ou cancelado"
         )
     
-    # Use status update logic
-    return await atualizar_status_pedido(pedido_id, "CANCELADO", db, current_user)
+    return _apply_status_change(db, pedido, "CANCELADO", current_user)
@@ -3,29 +3,43 @@ LANCH - Print Router
 API endpoints for printing receipts and reports
 """
 
+from functools import lru_cache
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, false, func
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from datetime import datetime, date
 
 from database import get_db
 from models import Usuario, Pedido, ItemPedido, Funcionario
-from models.caixa import Caixa, TransacaoCaixa, TransactionType
+from models.caixa import Caixa, TransacaoCaixa
 from routers.auth import get_current_user, require_admin
 from config import settings
 
 router = APIRouter(prefix="/print", tags=["Impressão"])
 
 
+@lru_cache(maxsize=1024)
 def _format_currency(value: float) -> str:
-    """Format value as Brazilian currency"""
-    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    """Format value as Brazilian currency, memoized since prices repeat a lot"""
+    # Grouping with "_" leaves the decimal point as the only dot, so two
+    # replaces swap the separators without a placeholder pass
+    return f"R$ {value:_.2f}".replace(".", ",").replace("_", ".")
+
+
+# Transaction type captions on the closing report
+_TIPO_LABELS = {
+    "VENDA": "Venda",
+    "SANGRIA": "Sangria",
+    "SUPRIMENTO": "Suprimento",
+    "TROCO": "Troco"
+}
 
 
-def _get_print_css() -> str:
-    """CSS for thermal printer (80mm width)"""
-    return """
+# CSS for thermal printer (80mm width), shared by every printed page
+_PRINT_CSS = """
     <style>
         @page {
             size: 80mm auto;
@@ -132,7 +146,9 @@ async def imprimir_comanda(
     """
     Generate printable order receipt (comanda)
     """
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
+    pedido = db.query(Pedido).options(
+        joinedload(Pedido.funcionario)
+    ).filter(Pedido.id == pedido_id).first()
     
     if not pedido:
         raise HTTPException(
@@ -140,13 +156,15 @@ async def imprimir_comanda(
             detail="Pedido não encontrado"
         )
     
-    # Get order items
-    itens = db.query(ItemPedido).filter(ItemPedido.pedido_id == pedido_id).all()
+    # Get order items with their products in the same query
+    itens = db.query(ItemPedido).options(
+        joinedload(ItemPedido.produto)
+    ).filter(ItemPedido.pedido_id == pedido_id).all()
     
     # Get customer info
     cliente_info = ""
     if pedido.tipo_cliente == "FUNCIONARIO" and pedido.funcionario_id:
-        funcionario = db.query(Funcionario).filter(Funcionario.id == pedido.funcionario_id).first()
+        funcionario = pedido.funcionario
         if funcionario:
             cliente_info = f"<p><strong>Funcionário:</strong> {funcionario.nome}</p>"
             cliente_info += f"<p><strong>Matrícula:</strong> {funcionario.matricula}</p>"
@@ -154,9 +172,9 @@ async def imprimir_comanda(
         cliente_info = "<p><strong>Tipo:</strong> Avulso</p>"
     
     # Build items HTML
-    itens_html = ""
+    itens_parts = []
     for item in itens:
-        itens_html += f"""
+        itens_parts.append(f"""
         <div class="item">
             <div class="item-name">{item.produto.nome if item.produto else 'Produto'}</div>
             <div class="item-details">
@@ -164,7 +182,8 @@ async def imprimir_comanda(
                 <span>{_format_currency(float(item.subtotal))}</span>
             </div>
         </div>
-        """
+        """)
+    itens_html = "".join(itens_parts)
     
     html = f"""
     <!DOCTYPE html>
@@ -173,7 +192,7 @@ async def imprimir_comanda(
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Comanda #{pedido.numero}</title>
-        {_get_print_css()}
+        {_PRINT_CSS}
     </head>
     <body>
         <div class="header">
@@ -250,41 +269,47 @@ async def imprimir_fechamento(
         TransacaoCaixa.caixa_id == caixa.id
     ).order_by(TransacaoCaixa.criado_em).all()
     
-    # Calculate totals
-    vendas = [t for t in transacoes if t.tipo == TransactionType.VENDA.value]
-    sangrias = [t for t in transacoes if t.tipo == TransactionType.SANGRIA.value]
-    suprimentos = [t for t in transacoes if t.tipo in [TransactionType.SUPRIMENTO.value, TransactionType.TROCO.value]]
+    # Calculate totals in one pass over the transactions
+    total_vendas = total_sangrias = total_suprimentos = 0.0
+    vendas_dinheiro = vendas_cartao = vendas_pix = vendas_convenio = 0.0
+    vendas_count = 0
     
-    total_vendas = sum(float(t.valor) for t in vendas)
-    total_sangrias = sum(float(t.valor) for t in sangrias)
-    total_suprimentos = sum(float(t.valor) for t in suprimentos)
-    
-    # Sales by payment method
-    vendas_dinheiro = sum(float(t.valor) for t in vendas if t.forma_pagamento == "DINHEIRO")
-    vendas_cartao = sum(float(t.valor) for t in vendas if t.forma_pagamento == "CARTAO")
-    vendas_pix = sum(float(t.valor) for t in vendas if t.forma_pagamento == "PIX")
-    vendas_convenio = sum(float(t.valor) for t in vendas if t.forma_pagamento == "CONVENIO")
+    for t in transacoes:
+        valor = float(t.valor)
+        tipo = t.tipo
+        if tipo == "VENDA":
+            total_vendas += valor
+            vendas_count += 1
+            forma = t.forma_pagamento
+            if forma == "DINHEIRO":
+                vendas_dinheiro += valor
+            elif forma == "CARTAO":
+                vendas_cartao += valor
+            elif forma == "PIX":
+                vendas_pix += valor
+            elif forma == "CONVENIO":
+                vendas_convenio += valor
+        elif tipo == "SANGRIA":
+            total_sangrias += valor
+        elif tipo in ("SUPRIMENTO", "TROCO"):
+            total_suprimentos += valor
     
     # Expected cash = opening + supplies - withdrawals + cash sales
     valor_esperado = float(caixa.valor_abertura or 0) + total_suprimentos - total_sangrias + vendas_dinheiro
     
     # Build transactions HTML
-    trans_html = ""
+    trans_parts = []
     for t in transacoes[:20]:  # Limit to last 20
-        tipo_label = {
-            "VENDA": "Venda",
-            "SANGRIA": "Sangria",
-            "SUPRIMENTO": "Suprimento",
-            "TROCO": "Troco"
-        }.get(t.tipo, t.tipo)
+        tipo_label = _TIPO_LABELS.get(t.tipo, t.tipo)
         
         sinal = "-" if t.tipo == "SANGRIA" else "+"
-        trans_html += f"""
+        trans_parts.append(f"""
         <div class="item-details">
             <span>{t.criado_em.strftime('%H:%M')} - {tipo_label}</span>
             <span>{sinal}{_format_currency(float(t.valor))}</span>
         </div>
-        """
+        """)
+    trans_html = "".join(trans_parts)
     
     # Status
     status_label = "FECHADO ✓" if caixa.status == "FECHADO" else "ABERTO"
@@ -301,7 +326,7 @@ async def imprimir_fechamento(
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Fechamento de Caixa - {data.strftime('%d/%m/%Y')}</title>
-        {_get_print_css()}
+        {_PRINT_CSS}
     </head>
     <body>
         <div class="header">
@@ -372,7 +397,7 @@ async def imprimir_fechamento(
             </div>
             <div class="total-row">
                 <span>Qtd. Vendas:</span>
-                <span>{len(vendas)}</span>
+                <span>{vendas_count}</span>
             </div>
             <div class="divider"></div>
             <div class="total-row">
@@ -430,35 +455,38 @@ async def imprimir_consumo_setor(
     
     competencia_str = f"{competencia.mes:02d}/{competencia.ano}" if competencia else "Atual"
     
-    # Get employees
-    funcionarios = db.query(Funcionario).filter(
+    # Get employees with their consumption in one query
+    consumo_join = and_(
+        ConsumoMensal.funcionario_id == Funcionario.id,
+        ConsumoMensal.competencia_id == competencia.id
+    ) if competencia else false()
+    
+    funcionarios = db.query(
+        Funcionario.nome,
+        Funcionario.matricula,
+        Funcionario.limite_mensal,
+        func.coalesce(ConsumoMensal.valor_total, 0).label("consumo")
+    ).outerjoin(ConsumoMensal, consumo_join).filter(
         Funcionario.setor_id == setor_id,
         Funcionario.ativo == True
     ).order_by(Funcionario.nome).all()
     
     # Build employees HTML
-    func_html = ""
+    func_parts = []
     total_consumo = 0
     
-    for func in funcionarios:
-        consumo = 0
-        if competencia:
-            cm = db.query(ConsumoMensal).filter(
-                ConsumoMensal.funcionario_id == func.id,
-                ConsumoMensal.competencia_id == competencia.id
-            ).first()
-            if cm:
-                consumo = float(cm.valor_consumido)
+    for funcionario in funcionarios:
+        consumo = float(funcionario.consumo)
         
         total_consumo += consumo
-        limite = float(func.limite_mensal) if func.limite_mensal else 0
+        limite = float(funcionario.limite_mensal) if funcionario.limite_mensal else 0
         saldo = limite - consumo
         
-        func_html += f"""
+        func_parts.append(f"""
         <div class="item">
-            <div class="item-name">{func.nome}</div>
+            <div class="item-name">{funcionario.nome}</div>
             <div class="item-details">
-                <span>Mat: {func.matricula}</span>
+                <span>Mat: {funcionario.matricula}</span>
                 <span>Limite: {_format_currency(limite)}</span>
             </div>
             <div class="item-details">
@@ -466,7 +494,8 @@ async def imprimir_consumo_setor(
                 <span>Saldo: {_format_currency(saldo)}</span>
             </div>
         </div>
-        """
+        """)
+    func_html = "".join(func_parts)
     
     limite_setor = float(setor.limite_mensal) if setor.limite_mensal else None
     saldo_setor = limite_setor - total_consumo if limite_setor else None
@@ -478,7 +507,7 @@ async def imprimir_consumo_setor(
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Consumo por Setor - {setor.nome}</title>
-        {_get_print_css()}
+        {_PRINT_CSS}
     </head>
     <body>
         <div class="header">
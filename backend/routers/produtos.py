@@ -4,6 +4,7 @@ LANCH - Products Router
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import exists, select
 from typing import List
 
 from database import get_db
@@ -13,7 +14,8 @@ from schemas import (
     CategoriaCreate, CategoriaResponse
 )
 from routers.auth import get_current_user, require_admin
-from utils.audit import log_action
+from routers.estoque import invalidate_alertas_cache
+from utils.audit import log_action, snapshot
 
 router = APIRouter(prefix="/produtos", tags=["Produtos"])
 
@@ -40,8 +42,7 @@ async def criar_categoria(
     current_user: Usuario = Depends(require_admin)
 ):
     """Create a new category"""
-    existing = db.query(Categoria).filter(Categoria.nome == categoria.nome).first()
-    if existing:
+    if db.query(exists().where(Categoria.nome == categoria.nome)).scalar():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Categoria já existe"
@@ -49,10 +50,9 @@ async def criar_categoria(
     
     db_categoria = Categoria(**categoria.model_dump())
     db.add(db_categoria)
-    db.commit()
-    db.refresh(db_categoria)
+    db.flush()
     
-    log_action(db, current_user.id, "CRIAR", "categorias", db_categoria.id, None, db_categoria.to_dict())
+    log_action(db, current_user, "CRIAR", "categorias", db_categoria.id, None, db_categoria.to_dict())
     db.commit()
     
     return db_categoria
@@ -72,10 +72,10 @@ async def atualizar_categoria(
     
     dados_anteriores = categoria.to_dict()
     categoria.ativo = ativo
-    db.commit()
     
-    log_action(db, current_user.id, "ATUALIZAR", "categorias", categoria.id, dados_anteriores, categoria.to_dict())
+    log_action(db, current_user, "ATUALIZAR", "categorias", categoria.id, dados_anteriores, categoria.to_dict())
     db.commit()
+    invalidate_alertas_cache()
     
     return categoria
 
@@ -90,15 +90,23 @@ async def listar_produtos(
     current_user: Usuario = Depends(get_current_user)
 ):
     """List all products with optional filters"""
-    query = db.query(Produto)
+    stmt = select(
+        Produto.id,
+        Produto.nome,
+        Produto.categoria_id,
+        Categoria.nome.label("categoria_nome"),
+        Produto.preco,
+        Produto.ativo,
+        Produto.controlar_estoque,
+        Produto.estoque_atual
+    ).outerjoin(Categoria, Produto.categoria_id == Categoria.id)
     
     if ativo is not None:
-        query = query.filter(Produto.ativo == ativo)
+        stmt = stmt.where(Produto.ativo == ativo)
     if categoria_id is not None:
-        query = query.filter(Produto.categoria_id == categoria_id)
+        stmt = stmt.where(Produto.categoria_id == categoria_id)
     
-    produtos = query.order_by(Produto.nome).all()
-    return [p.to_dict() for p in produtos]
+    return [dict(row) for row in db.execute(stmt.order_by(Produto.nome)).mappings()]
 
 
 @router.get("/{produto_id}", response_model=ProdutoResponse)
@@ -111,7 +119,7 @@ async def obter_produto(
     produto = db.query(Produto).filter(Produto.id == produto_id).first()
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
-    return produto.to_dict()
+    return produto
 
 
 @router.post("", response_model=ProdutoResponse, status_code=status.HTTP_201_CREATED)
@@ -128,13 +136,14 @@ async def criar_produto(
     
     db_produto = Produto(**produto.model_dump())
     db.add(db_produto)
-    db.commit()
+    db.flush()
     db.refresh(db_produto)
     
-    log_action(db, current_user.id, "CRIAR", "produtos", db_produto.id, None, db_produto.to_dict())
+    log_action(db, current_user, "CRIAR", "produtos", db_produto.id, None, snapshot(ProdutoResponse, db_produto))
     db.commit()
+    invalidate_alertas_cache()
     
-    return db_produto.to_dict()
+    return db_produto
 
 
 @router.put("/{produto_id}", response_model=ProdutoResponse)
@@ -149,19 +158,20 @@ async def atualizar_produto(
     if not db_produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
-    dados_anteriores = db_produto.to_dict()
+    dados_anteriores = snapshot(ProdutoResponse, db_produto)
     
     update_data = produto.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_produto, key, value)
     
-    db.commit()
+    db.flush()
     db.refresh(db_produto)
     
-    log_action(db, current_user.id, "ATUALIZAR", "produtos", db_produto.id, dados_anteriores, db_produto.to_dict())
+    log_action(db, current_user, "ATUALIZAR", "produtos", db_produto.id, dados_anteriores, snapshot(ProdutoResponse, db_produto))
     db.commit()
+    invalidate_alertas_cache()
     
-    return db_produto.to_dict()
+    return db_produto
 
 
 @router.delete("/{produto_id}")
@@ -175,11 +185,11 @@ async def desativar_produto(
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
-    dados_anteriores = produto.to_dict()
+    dados_anteriores = snapshot(ProdutoResponse, produto)
     produto.ativo = False
-    db.commit()
     
-    log_action(db, current_user.id, "DESATIVAR", "produtos", produto.id, dados_anteriores, produto.to_dict())
+    log_action(db, current_user, "DESATIVAR", "produtos", produto.id, dados_anteriores, snapshot(ProdutoResponse, produto))
     db.commit()
+    invalidate_alertas_cache()
     
     return {"message": "Produto desativado com sucesso"}
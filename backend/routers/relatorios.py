@@ -3,7 +3,7 @@ LANCH - Reports Router
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func
 from datetime import datetime, timedelta
 from typing import List
@@ -14,9 +14,12 @@ from routers.auth import get_current_user, require_admin
 
 router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
 
+# Endpoints here are plain def: their queries block, so FastAPI runs them on
+# the threadpool and dashboard polling never stalls the event loop
+
 
 @router.get("/vendas-diarias")
-async def relatorio_vendas_diarias(
+def relatorio_vendas_diarias(
     data_inicio: str = None,
     data_fim: str = None,
     db: Session = Depends(get_db),
@@ -71,7 +74,7 @@ async def relatorio_vendas_diarias(
 
 
 @router.get("/formas-pagamento")
-async def relatorio_formas_pagamento(
+def relatorio_formas_pagamento(
     data_inicio: str = None,
     data_fim: str = None,
     db: Session = Depends(get_db),
@@ -110,7 +113,7 @@ async def relatorio_formas_pagamento(
 
 
 @router.get("/produtos-vendidos")
-async def relatorio_produtos_vendidos(
+def relatorio_produtos_vendidos(
     data_inicio: str = None,
     data_fim: str = None,
     limit: int = 20,
@@ -157,7 +160,7 @@ async def relatorio_produtos_vendidos(
 
 
 @router.get("/funcionarios-consumo")
-async def relatorio_consumo_funcionarios(
+def relatorio_consumo_funcionarios(
     competencia_id: int = None,
     setor: str = None,
     db: Session = Depends(get_db),
@@ -177,7 +180,10 @@ async def relatorio_consumo_funcionarios(
     query = db.query(ConsumoMensal).filter(
         ConsumoMensal.competencia_id == competencia.id,
         ConsumoMensal.valor_total > 0
-    ).join(Funcionario)
+    ).join(Funcionario).options(
+        # Employees come from the join above; their sector in the same query
+        contains_eager(ConsumoMensal.funcionario).joinedload(Funcionario.setor)
+    )
     
     if setor:
         query = query.filter(Funcionario.setor.ilike(f"%{setor}%"))
@@ -191,8 +197,8 @@ async def relatorio_consumo_funcionarios(
         result.append({
             "matricula": c.funcionario.matricula,
             "nome": c.funcionario.nome,
-            "setor": c.funcionario.setor,
-            "centro_custo": c.funcionario.centro_custo,
+            "setor": c.funcionario.setor_exibicao,
+            "centro_custo": c.funcionario.centro_custo_exibicao,
             "limite_mensal": float(c.funcionario.limite_mensal),
             "valor_consumido": valor,
             "saldo": float(c.funcionario.limite_mensal) - valor
@@ -208,7 +214,7 @@ async def relatorio_consumo_funcionarios(
 
 
 @router.get("/dashboard")
-async def dashboard(
+def dashboard(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -244,7 +250,7 @@ async def dashboard(
 
 
 @router.get("/audit-log")
-async def listar_audit_log(
+def listar_audit_log(
     tabela: str = None,
     data_inicio: str = None,
     data_fim: str = None,
@@ -268,7 +274,7 @@ async def listar_audit_log(
 
 
 @router.get("/dashboard/charts")
-async def get_dashboard_charts(
+def get_dashboard_charts(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -5,7 +5,7 @@ API endpoints for department/cost center management
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import exists, func
 from typing import List, Optional
 from datetime import datetime, date
 
@@ -17,6 +17,7 @@ from schemas.setor import (
     SetorResumo, ConsumoSetorReport
 )
 from routers.auth import require_admin, get_current_user
+from routers.funcionarios import invalidate_busca_cache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -130,8 +131,7 @@ async def criar_setor(
     Create a new sector/department
     """
     # Check if name already exists
-    existing = db.query(Setor).filter(Setor.nome == dados.nome).first()
-    if existing:
+    if db.query(exists().where(Setor.nome == dados.nome)).scalar():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Já existe um setor com este nome"
@@ -139,8 +139,7 @@ async def criar_setor(
     
     # Check if code already exists
     if dados.codigo:
-        existing = db.query(Setor).filter(Setor.codigo == dados.codigo).first()
-        if existing:
+        if db.query(exists().where(Setor.codigo == dados.codigo)).scalar():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Já existe um setor com este código"
@@ -187,8 +186,7 @@ async def atualizar_setor(
     
     # Check name uniqueness if changing
     if dados.nome and dados.nome != setor.nome:
-        existing = db.query(Setor).filter(Setor.nome == dados.nome).first()
-        if existing:
+        if db.query(exists().where(Setor.nome == dados.nome)).scalar():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Já existe um setor com este nome"
@@ -202,6 +200,7 @@ async def atualizar_setor(
     setor.atualizado_em = datetime.utcnow()
     
     db.commit()
+    invalidate_busca_cache()
     db.refresh(setor)
     
     logger.info(f"Sector updated: {setor.nome}",
@@ -241,6 +240,7 @@ async def excluir_setor(
     
     setor.ativo = False
     db.commit()
+    invalidate_busca_cache()
     
     logger.info(f"Sector deactivated: {setor.nome}",
                 extra={"user_id": current_user.id, "setor_id": setor.id})
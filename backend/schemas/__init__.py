@@ -14,7 +14,7 @@ from .funcionario import (
 )
 from .pedido import (
     ItemPedidoCreate, ItemPedidoResponse,
-    PedidoCreate, PedidoUpdate, PedidoResponse, PedidoCozinha
+    PedidoCreate, PedidoUpdate, PedidoResponse, PedidoCozinha, PedidosHoje
 )
 from .relatorio import (
     ConsumoFuncionarioReport, VendaDiariaReport,
@@ -0,0 +1,37 @@
+"""
+LANCH - Audit Schemas
+Pydantic schemas for audit log listing
+"""
+
+from pydantic import BaseModel
+from typing import Optional, Any, List
+from datetime import datetime
+
+
+class AuditLogResponse(BaseModel):
+    """Schema for an audit log entry"""
+    id: int
+    timestamp: datetime
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    action: str
+    table_name: Optional[str] = None
+    record_id: Optional[int] = None
+    old_value: Optional[Any] = None
+    new_value: Optional[Any] = None
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    endpoint: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class AuditLogPage(BaseModel):
+    """One page of audit logs with the cursor for the next one"""
+    items: List[AuditLogResponse]
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str] = None
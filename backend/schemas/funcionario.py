@@ -2,7 +2,7 @@
 LANCH - Pydantic Schemas for Employees
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices
 from typing import Optional
 from datetime import datetime
 
@@ -30,6 +30,12 @@ class FuncionarioUpdate(BaseModel):
 
 class FuncionarioResponse(FuncionarioBase):
     id: int
+    # Read from the linked sector when there is one
+    setor: Optional[str] = Field(None, validation_alias=AliasChoices("setor_exibicao", "setor"))
+    setor_id: Optional[int] = None
+    centro_custo: Optional[str] = Field(
+        None, validation_alias=AliasChoices("centro_custo_exibicao", "centro_custo")
+    )
     ativo: bool
     criado_em: Optional[datetime] = None
     
@@ -67,3 +67,13 @@ class PedidoCozinha(BaseModel):
     criado_em: datetime
     itens: str  # Concatenated items string
     tempo_espera: int  # Minutes waiting
+
+
+class PedidosHoje(BaseModel):
+    """Today's orders summary"""
+    data: str
+    total_pedidos: int
+    total_funcionarios: int
+    total_pacientes: int
+    valor_total: float
+    pedidos: List[PedidoResponse] = []
@@ -3,15 +3,18 @@ LANCH - Export Service
 """
 
 import io
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, Any
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
 
 
-def export_to_excel(data: List[Dict[str, Any]], competencia) -> io.BytesIO:
+def export_to_excel(rows: Iterable[Any], competencia) -> io.BytesIO:
     """
     Export consumption data to Excel with formatting
+    
+    Rows are tuples with matricula, nome, setor, centro_custo and
+    valor_total attributes.
     """
     wb = Workbook()
     ws = wb.active
@@ -45,22 +48,24 @@ def export_to_excel(data: List[Dict[str, Any]], competencia) -> io.BytesIO:
         cell.border = thin_border
     
     # Data
+    comp_str = f"{competencia.mes:02d}/{competencia.ano}"
     total_geral = 0
-    for row_idx, item in enumerate(data, 4):
-        ws.cell(row=row_idx, column=1, value=item["matricula"]).border = thin_border
-        ws.cell(row=row_idx, column=2, value=item["nome"]).border = thin_border
-        ws.cell(row=row_idx, column=3, value=item["setor"]).border = thin_border
-        ws.cell(row=row_idx, column=4, value=item["centro_custo"]).border = thin_border
+    row_idx = 3
+    for row_idx, item in enumerate(rows, 4):
+        ws.cell(row=row_idx, column=1, value=item.matricula).border = thin_border
+        ws.cell(row=row_idx, column=2, value=item.nome).border = thin_border
+        ws.cell(row=row_idx, column=3, value=item.setor).border = thin_border
+        ws.cell(row=row_idx, column=4, value=item.centro_custo).border = thin_border
         
-        valor_cell = ws.cell(row=row_idx, column=5, value=item["valor_total"])
+        valor_cell = ws.cell(row=row_idx, column=5, value=item.valor_total)
         valor_cell.number_format = 'R$ #,##0.00'
         valor_cell.border = thin_border
         
-        ws.cell(row=row_idx, column=6, value=item["competencia"]).border = thin_border
-        total_geral += item["valor_total"]
+        ws.cell(row=row_idx, column=6, value=comp_str).border = thin_border
+        total_geral += item.valor_total
     
     # Total row
-    total_row = len(data) + 4
+    total_row = row_idx + 1
     ws.cell(row=total_row, column=4, value="TOTAL GERAL:").font = Font(bold=True)
     total_cell = ws.cell(row=total_row, column=5, value=total_geral)
     total_cell.font = Font(bold=True)
@@ -79,29 +84,32 @@ def export_to_excel(data: List[Dict[str, Any]], competencia) -> io.BytesIO:
     return buffer
 
 
-def export_to_csv(data: List[Dict[str, Any]], competencia) -> str:
+def iter_csv(rows: Iterable[Any], competencia) -> Iterator[str]:
     """
-    Export to CSV compatible with TOTVS RM
+    Yield the TOTVS RM CSV one line at a time
     Layout: MATRICULA;NOME;CENTRO_CUSTO;VALOR;COMPETENCIA;TIPO_DESCONTO
     """
-    lines = []
-    
     # Header
-    lines.append("MATRICULA;NOME;CENTRO_CUSTO;VALOR;COMPETENCIA;TIPO_DESCONTO")
+    yield "MATRICULA;NOME;CENTRO_CUSTO;VALOR;COMPETENCIA;TIPO_DESCONTO"
     
     # Data
-    for item in data:
-        valor_str = f"{item['valor_total']:.2f}".replace(".", ",")
-        comp_str = f"{competencia.mes:02d}/{competencia.ano}"
+    comp_str = f"{competencia.mes:02d}/{competencia.ano}"
+    for item in rows:
+        valor_str = f"{item.valor_total:.2f}".replace(".", ",")
         
         line = ";".join([
-            item["matricula"],
-            item["nome"],
-            item["centro_custo"],
+            item.matricula,
+            item.nome,
+            item.centro_custo or "",
             valor_str,
             comp_str,
             "LANCHONETE"  # Tipo de desconto fixo
         ])
-        lines.append(line)
-    
-    return "\n".join(lines)
+        yield "\n" + line
+
+
+def export_to_csv(rows: Iterable[Any], competencia) -> str:
+    """
+    Export to CSV compatible with TOTVS RM
+    """
+    return "".join(iter_csv(rows, competencia))
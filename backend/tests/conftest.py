@@ -1,6 +1,11 @@
 """
 Pytest configuration and fixtures for LANCH system tests
 """
+import os
+
+# Cheap bcrypt for tests; must be set before settings are loaded
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -9,7 +14,12 @@ from sqlalchemy.pool import StaticPool
 
 from database import Base, get_db
 from main import app
+from middleware import limiter
 from models import Usuario
+from routers.auth import _user_cache
+from routers.competencias import invalidate_competencia_aberta
+from routers.estoque import _alertas_cache
+from routers.funcionarios import _busca_cache
 from utils.security import get_password_hash
 
 
@@ -46,6 +56,11 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    _user_cache.clear()
+    _alertas_cache.clear()
+    _busca_cache.clear()
+    invalidate_competencia_aberta()
+    limiter.reset()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -0,0 +1,78 @@
+"""
+Tests for admin user management
+"""
+from fastapi import status
+
+from models import Usuario
+from utils.security import verify_password
+
+
+def novo_usuario(username, perfil="ATENDENTE"):
+    """Payload for one user of a bulk request"""
+    return {"username": username, "nome": f"Usuário {username}", "perfil": perfil, "password": f"{username}@123"}
+
+
+class TestBulkCreate:
+    """Test cases for creating users in bulk"""
+    
+    def test_creates_all(self, client, auth_headers, db_session):
+        """Test every user is created with a hash of its own password"""
+        payload = [novo_usuario(f"lote{i}") for i in range(5)]
+        
+        response = client.post("/admin/usuarios/bulk", json=payload, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [u["username"] for u in response.json()] == [u["username"] for u in payload]
+        for dados in payload:
+            usuario = db_session.query(Usuario).filter(Usuario.username == dados["username"]).one()
+            assert verify_password(dados["password"], usuario.password_hash)
+            assert usuario.perfil == "ATENDENTE"
+    
+    def test_empty_request(self, client, auth_headers):
+        """Test an empty list creates nothing"""
+        response = client.post("/admin/usuarios/bulk", json=[], headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+    
+    def test_repeated_username(self, client, auth_headers, db_session):
+        """Test a username repeated within the request is refused"""
+        payload = [novo_usuario("lote1"), novo_usuario("lote1")]
+        
+        response = client.post("/admin/usuarios/bulk", json=payload, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert db_session.query(Usuario).filter(Usuario.username == "lote1").count() == 0
+    
+    def test_existing_username(self, client, auth_headers, db_session):
+        """Test the whole batch is refused when one username exists"""
+        payload = [novo_usuario("lote1"), novo_usuario("testadmin")]
+        
+        response = client.post("/admin/usuarios/bulk", json=payload, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "testadmin" in response.json()["message"]
+        assert db_session.query(Usuario).filter(Usuario.username == "lote1").count() == 0
+    
+    def test_invalid_perfil(self, client, auth_headers):
+        """Test an unknown profile is refused"""
+        payload = [novo_usuario("lote1", perfil="GERENTE")]
+        
+        response = client.post("/admin/usuarios/bulk", json=payload, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_requires_admin(self, client, atendente_user):
+        """Test non-admin users cannot create users"""
+        token = client.post("/auth/login", json={
+            "username": "testatendente",
+            "password": "TestAtend@123"
+        }).json()["access_token"]
+        
+        response = client.post(
+            "/admin/usuarios/bulk",
+            json=[novo_usuario("lote1")],
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,114 @@
+"""
+Tests for audit logging
+"""
+import asyncio
+
+import pytest
+
+import middleware.audit
+import utils.audit
+from middleware.audit import AuditWriter, audit_action
+from models.audit import AuditLog
+from utils.audit import log_action
+
+
+class RecordingWriter:
+    """Running audit writer that keeps what it is given"""
+    
+    running = True
+    
+    def __init__(self):
+        self.entries = []
+    
+    def enqueue(self, entry):
+        self.entries.append(entry)
+        return True
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """Replace the background audit writer with a recording one"""
+    recording = RecordingWriter()
+    monkeypatch.setattr(utils.audit, "audit_writer", recording)
+    return recording
+
+
+class TestLogAction:
+    """Test cases for log_action"""
+    
+    def test_entry_queued_after_commit(self, db_session, writer, admin_user):
+        """Test the entry reaches the writer only once the commit succeeds"""
+        log_action(db_session, admin_user, "CRIAR", "produtos", 1)
+        assert writer.entries == []
+        
+        db_session.commit()
+        
+        assert len(writer.entries) == 1
+        assert writer.entries[0]["action"] == "CRIAR"
+        assert writer.entries[0]["username"] == "testadmin"
+    
+    def test_entry_dropped_on_rollback(self, db_session, writer, admin_user):
+        """Test a rolled back change leaves no audit entry behind"""
+        log_action(db_session, admin_user, "CRIAR", "produtos", 1)
+        db_session.rollback()
+        db_session.commit()
+        
+        assert writer.entries == []
+    
+    def test_entry_dropped_on_close(self, db_session, writer, admin_user):
+        """Test a session closed without committing leaves no audit entry"""
+        log_action(db_session, admin_user, "CRIAR", "produtos", 1)
+        db_session.close()
+        db_session.commit()
+        
+        assert writer.entries == []
+    
+    def test_entry_in_transaction_without_writer(self, db_session, admin_user):
+        """Test the entry is saved by the caller's commit when no writer runs"""
+        log_action(db_session, admin_user, "CRIAR", "produtos", 1)
+        db_session.commit()
+        
+        assert db_session.query(AuditLog).filter(AuditLog.action == "CRIAR").count() == 1
+
+
+class TestAuditActionFallback:
+    """Test cases for audit_action writing directly without the writer"""
+    
+    def test_direct_write_is_tracked(self, monkeypatch, admin_user):
+        """Test the fallback write is held until it finishes and then released"""
+        written = []
+        monkeypatch.setattr(AuditWriter, "_write", staticmethod(written.extend))
+        
+        @audit_action("CRIAR", "produtos")
+        async def endpoint(db, current_user):
+            return None
+        
+        async def run():
+            await endpoint(db=object(), current_user=admin_user)
+            pending = set(middleware.audit._direct_writes)
+            assert len(pending) == 1
+            await asyncio.gather(*pending)
+        
+        asyncio.run(run())
+        
+        assert [entry["action"] for entry in written] == ["CRIAR"]
+        assert middleware.audit._direct_writes == set()
+    
+    def test_failed_direct_write_is_released(self, monkeypatch, admin_user):
+        """Test a failing fallback write does not stay referenced"""
+        def fail(batch):
+            raise RuntimeError("database is locked")
+        monkeypatch.setattr(AuditWriter, "_write", staticmethod(fail))
+        
+        @audit_action("CRIAR", "produtos")
+        async def endpoint(db, current_user):
+            return None
+        
+        async def run():
+            await endpoint(db=object(), current_user=admin_user)
+            await asyncio.gather(*middleware.audit._direct_writes, return_exceptions=True)
+            await asyncio.sleep(0)
+        
+        asyncio.run(run())
+        
+        assert middleware.audit._direct_writes == set()
@@ -0,0 +1,97 @@
+"""
+Tests for keyset pagination of audit logs
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+
+from models.audit import AuditLog
+from utils.pagination import encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def audit_logs(db_session):
+    """Seven entries, three of them sharing one timestamp"""
+    base = datetime(2026, 1, 10, 12, 0, 0)
+    timestamps = [
+        base,
+        base + timedelta(minutes=1),
+        base + timedelta(minutes=2),
+        base + timedelta(minutes=2),
+        base + timedelta(minutes=2),
+        base + timedelta(minutes=3),
+        base + timedelta(minutes=4),
+    ]
+    logs = [
+        AuditLog(timestamp=ts, username="testadmin", action="ATUALIZAR" if i % 2 else "CRIAR", status="SUCCESS")
+        for i, ts in enumerate(timestamps)
+    ]
+    db_session.add_all(logs)
+    db_session.commit()
+    return logs
+
+
+def expected_order(logs):
+    """Ids in the endpoint's order: newest first, id breaking ties"""
+    return [log.id for log in sorted(logs, key=lambda log: (log.timestamp, log.id), reverse=True)]
+
+
+class TestCursor:
+    """Test cases for cursor encoding"""
+    
+    def test_round_trip(self):
+        """Test a cursor decodes back to its position"""
+        position = (datetime(2026, 1, 10, 12, 30, 15, 250000), 42)
+        
+        assert decode_cursor(encode_cursor(*position)) == position
+    
+    def test_malformed(self):
+        """Test garbage is rejected with ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestAuditLogPages:
+    """Test cases for walking /audit/logs with next_cursor"""
+    
+    def test_pages_cover_every_row_once(self, client, auth_headers, audit_logs):
+        """Test paging visits every entry once, in order, across timestamp ties"""
+        ids = []
+        cursor = None
+        for _ in range(len(audit_logs)):
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/audit/logs", params=params, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            
+            page = response.json()
+            ids += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            assert page["has_more"] == (cursor is not None)
+            if cursor is None:
+                break
+        
+        assert ids == expected_order(audit_logs)
+    
+    def test_filters_apply_across_pages(self, client, auth_headers, audit_logs):
+        """Test a filtered walk returns only matching entries"""
+        criar = [log for log in audit_logs if log.action == "CRIAR"]
+        
+        first = client.get("/audit/logs", params={"limit": 3, "action": "CRIAR"}, headers=auth_headers).json()
+        second = client.get(
+            "/audit/logs",
+            params={"limit": 3, "action": "CRIAR", "cursor": first["next_cursor"]},
+            headers=auth_headers
+        ).json()
+        
+        assert [item["id"] for item in first["items"] + second["items"]] == expected_order(criar)
+        assert second["has_more"] is False
+        assert second["next_cursor"] is None
+    
+    def test_invalid_cursor(self, client, auth_headers):
+        """Test a malformed cursor is a client error"""
+        response = client.get("/audit/logs", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -3,6 +3,7 @@ Tests for authentication endpoints
 """
 import pytest
 from fastapi import status
+from sqlalchemy import text
 
 
 class TestLogin:
@@ -52,6 +53,19 @@ class TestLogin:
         assert response.status_code == status.HTTP_403_FORBIDDEN
         assert "desativado" in response.json()["detail"].lower()
     
+    def test_login_without_partial_index(self, client, db_session, admin_user):
+        """Test login does not depend on the active users index existing"""
+        db_session.execute(text("DROP INDEX ix_usuarios_username_active"))
+        db_session.commit()
+        
+        response = client.post("/auth/login", json={
+            "username": "testadmin",
+            "password": "TestAdmin@123"
+        })
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert "access_token" in response.json()
+    
     def test_login_missing_fields(self, client):
         """Test login with missing required fields"""
         response = client.post("/auth/login", json={
@@ -0,0 +1,60 @@
+"""
+Tests for cash register totals
+"""
+import pytest
+from fastapi import status
+
+from models.caixa import Caixa, TransacaoCaixa, TransactionType
+from routers.caixa import _add_to_caixa_totals, _calculate_caixa_summary
+
+
+@pytest.fixture
+def caixa_movimentado(client, auth_headers):
+    """Open today's register with change, one withdrawal and one addition"""
+    response = client.post("/caixa/abrir", json={"valor_abertura": 100}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    client.post("/caixa/sangria", json={"valor": 30, "motivo": "Depósito"}, headers=auth_headers)
+    client.post("/caixa/suprimento", json={"valor": 20}, headers=auth_headers)
+
+
+class TestCaixaTotals:
+    """Test cases for the running totals kept on the register row"""
+    
+    def test_resumo_uses_running_totals(self, client, auth_headers, caixa_movimentado):
+        """Test the summary reflects every transaction of the day"""
+        response = client.get("/caixa/resumo", headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_sangrias"] == 30
+        assert data["total_suprimentos"] == 120
+        assert data["transacoes_count"] == 3
+        assert data["valor_esperado"] == 190
+    
+    def test_running_totals_match_aggregate(self, db_session, caixa_movimentado, admin_user):
+        """Test running totals equal the aggregated fallback, sales included"""
+        caixa = db_session.query(Caixa).one()
+        for forma_pagamento, valor in (("DINHEIRO", 12.5), ("PIX", 7.5), ("DINHEIRO", 5)):
+            venda = TransacaoCaixa(
+                caixa_id=caixa.id,
+                tipo=TransactionType.VENDA.value,
+                valor=valor,
+                forma_pagamento=forma_pagamento,
+                usuario_id=admin_user.id
+            )
+            db_session.add(venda)
+            _add_to_caixa_totals(db_session, caixa, venda)
+        db_session.commit()
+        
+        running = _calculate_caixa_summary(caixa, db_session)
+        
+        # Registers opened before running totals fall back to aggregating
+        caixa.transacoes_count = None
+        aggregated = _calculate_caixa_summary(caixa, db_session)
+        
+        assert running == aggregated
+        assert running["total_vendas"] == 25
+        assert running["vendas_dinheiro"] == 17.5
+        assert running["vendas_pix"] == 7.5
+        assert running["transacoes_count"] == 6
+        assert running["valor_esperado"] == 207.5
@@ -0,0 +1,106 @@
+"""
+Tests for competencies and monthly consumption
+"""
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+
+from models import Categoria, Competencia, ConsumoMensal, Funcionario, Pedido, Produto
+from routers.competencias import get_competencia_aberta_id, invalidate_competencia_aberta
+
+
+@pytest.fixture(autouse=True)
+def clear_competencia_cache():
+    """Start and finish every test without a cached competency"""
+    invalidate_competencia_aberta()
+    yield
+    invalidate_competencia_aberta()
+
+
+class TestCompetenciaAberta:
+    """Test cases for the cached open competency id"""
+    
+    def test_returns_open_competencia(self, db_session):
+        """Test the open competency id is found and served again"""
+        competencia = Competencia(ano=2026, mes=1, status="ABERTA")
+        db_session.add(competencia)
+        db_session.commit()
+        
+        assert get_competencia_aberta_id(db_session) == competencia.id
+        assert get_competencia_aberta_id(db_session) == competencia.id
+    
+    def test_no_open_competencia(self, db_session):
+        """Test None is returned when every competency is closed"""
+        db_session.add(Competencia(ano=2026, mes=1, status="FECHADA"))
+        db_session.commit()
+        
+        assert get_competencia_aberta_id(db_session) is None
+    
+    def test_cached_id_trusted_until_invalidated(self, db_session):
+        """Test the cached id is served without a query until it is dropped"""
+        antiga = Competencia(ano=2026, mes=1, status="ABERTA")
+        db_session.add(antiga)
+        db_session.commit()
+        assert get_competencia_aberta_id(db_session) == antiga.id
+        
+        # Another worker closes it and opens the next month
+        antiga.status = "FECHADA"
+        nova = Competencia(ano=2026, mes=2, status="ABERTA")
+        db_session.add(nova)
+        db_session.commit()
+        
+        assert get_competencia_aberta_id(db_session) == antiga.id
+        invalidate_competencia_aberta()
+        assert get_competencia_aberta_id(db_session) == nova.id
+    
+    def test_employee_order_in_closed_competencia(self, client, auth_headers, db_session):
+        """Test an employee order is refused when another worker closed the cached competency"""
+        competencia = Competencia(ano=2026, mes=1, status="ABERTA")
+        categoria = Categoria(nome="Lanches")
+        funcionario = Funcionario(matricula="100", cpf="12345678900", nome="Ana")
+        db_session.add_all([competencia, categoria, funcionario])
+        db_session.flush()
+        produto = Produto(nome="Misto", categoria_id=categoria.id, preco=8, ativo=True)
+        db_session.add(produto)
+        db_session.commit()
+        assert get_competencia_aberta_id(db_session) == competencia.id
+        
+        competencia.status = "FECHADA"
+        db_session.commit()
+        
+        response = client.post("/pedidos", json={
+            "tipo_cliente": "FUNCIONARIO",
+            "funcionario_id": funcionario.id,
+            "forma_pagamento": "CONVENIO",
+            "itens": [{"produto_id": produto.id, "quantidade": 1}]
+        }, headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # The request's session is closed uncommitted, as get_db does
+        db_session.rollback()
+        assert db_session.query(Pedido).count() == 0
+        assert db_session.query(ConsumoMensal).count() == 0
+        assert get_competencia_aberta_id(db_session) is None
+
+
+class TestConsumoMensal:
+    """Test cases for monthly consumption serialization"""
+    
+    def test_valor_total_in_reais(self, db_session):
+        """Test valor_total is reported in reais, as stored"""
+        competencia = Competencia(ano=2026, mes=1, status="ABERTA")
+        funcionario = Funcionario(matricula="100", cpf="12345678900", nome="Ana")
+        db_session.add_all([competencia, funcionario])
+        db_session.flush()
+        consumo = ConsumoMensal(
+            funcionario_id=funcionario.id,
+            competencia_id=competencia.id,
+            valor_total=Decimal("25.00")
+        )
+        db_session.add(consumo)
+        db_session.commit()
+        
+        data = consumo.to_dict()
+        assert data["valor_total"] == 25.0
+        assert data["referencia"] == "01/2026"
@@ -0,0 +1,84 @@
+"""
+Tests for order creation stock reservation
+"""
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from models import Categoria, Competencia, Pedido, Produto
+
+
+@pytest.fixture
+def produto(db_session):
+    """Stock-controlled product with an open competency to order in"""
+    categoria = Categoria(nome="Lanches")
+    db_session.add_all([categoria, Competencia(ano=2026, mes=1, status="ABERTA")])
+    db_session.flush()
+    produto = Produto(
+        nome="Misto",
+        categoria_id=categoria.id,
+        preco=8,
+        ativo=True,
+        controlar_estoque=True,
+        estoque_atual=5
+    )
+    db_session.add(produto)
+    db_session.commit()
+    return produto
+
+
+def pedido_json(produto_id, *quantidades):
+    """Visitor order with one line per quantity"""
+    return {
+        "tipo_cliente": "VISITANTE",
+        "forma_pagamento": "DINHEIRO",
+        "itens": [{"produto_id": produto_id, "quantidade": q} for q in quantidades]
+    }
+
+
+class TestStockReservation:
+    """Test cases for the conditional stock decrement"""
+    
+    def test_decrements_stock(self, client, auth_headers, db_session, produto):
+        """Test an order takes its units from stock, repeated lines included"""
+        response = client.post("/pedidos", json=pedido_json(produto.id, 2, 1), headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        db_session.expire_all()
+        assert produto.estoque_atual == 2
+    
+    def test_insufficient_stock(self, client, auth_headers, db_session, produto):
+        """Test an order for more than the stock is refused and changes nothing"""
+        response = client.post("/pedidos", json=pedido_json(produto.id, 4, 2), headers=auth_headers)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Disponível: 1" in response.json()["message"]
+        db_session.expire_all()
+        assert produto.estoque_atual == 5
+        assert db_session.query(Pedido).count() == 0
+    
+    def test_stock_taken_concurrently(self, client, auth_headers, db_session, produto):
+        """Test stock sold between the check and the decrement is not oversold"""
+        engine = db_session.get_bind()
+        vendido = []
+        
+        def sell_first(conn, cursor, statement, parameters, context, executemany):
+            # Another order takes most of the stock right before ours reserves
+            if statement.startswith("UPDATE produtos SET estoque_atual") and not vendido:
+                vendido.append(True)
+                cursor.connection.execute(
+                    "UPDATE produtos SET estoque_atual = 1 WHERE id = ?", (produto.id,)
+                )
+        
+        event.listen(engine, "before_cursor_execute", sell_first)
+        try:
+            response = client.post("/pedidos", json=pedido_json(produto.id, 3), headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", sell_first)
+        
+        assert vendido
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Disponível: 1" in response.json()["message"]
+        db_session.expire_all()
+        assert produto.estoque_atual == 1
@@ -0,0 +1,103 @@
+"""
+Tests for the login rate limiter
+"""
+import pytest
+from fastapi import status
+
+import middleware.rate_limit as rate_limit
+from config import settings
+from middleware import limiter
+from middleware.rate_limit import TokenBucketLimiter, RATE_LIMIT_MESSAGE
+
+
+class FakeClock:
+    """Stand-in for the time module with a manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive the limiter from a fake clock"""
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def fresh_limiter():
+    """Give the shared login limiter a clean slate and leave one behind"""
+    limiter.reset()
+    yield limiter
+    limiter.reset()
+
+
+class TestTokenBucketLimiter:
+    """Test cases for the token bucket"""
+    
+    def test_denies_after_capacity(self, clock):
+        """Test the request after the budget is spent is denied"""
+        bucket = TokenBucketLimiter(capacity=3, period=60)
+        
+        assert [bucket.hit("1.2.3.4") for _ in range(3)] == [True, True, True]
+        assert bucket.hit("1.2.3.4") is False
+    
+    def test_keys_are_independent(self, clock):
+        """Test one client exhausting its budget does not affect another"""
+        bucket = TokenBucketLimiter(capacity=1, period=60)
+        
+        assert bucket.hit("1.2.3.4") is True
+        assert bucket.hit("1.2.3.4") is False
+        assert bucket.hit("5.6.7.8") is True
+    
+    def test_refills_after_period(self, clock):
+        """Test the bucket is full again once a period has passed"""
+        bucket = TokenBucketLimiter(capacity=2, period=60)
+        bucket.hit("1.2.3.4")
+        bucket.hit("1.2.3.4")
+        assert bucket.hit("1.2.3.4") is False
+        
+        clock.now += 30
+        assert bucket.hit("1.2.3.4") is True
+        assert bucket.hit("1.2.3.4") is False
+        
+        clock.now += 60
+        assert bucket.hit("1.2.3.4") is True
+        assert bucket.hit("1.2.3.4") is True
+        assert bucket.hit("1.2.3.4") is False
+    
+    def test_sweep_drops_idle_keys(self, clock):
+        """Test buckets idle for longer than a period are forgotten"""
+        bucket = TokenBucketLimiter(capacity=2, period=60)
+        bucket.hit("1.2.3.4")
+        clock.now += 50
+        bucket.hit("5.6.7.8")
+        
+        clock.now += 20
+        bucket.hit("9.9.9.9")
+        
+        assert set(bucket._buckets) == {"5.6.7.8", "9.9.9.9"}
+
+
+class TestLoginRateLimit:
+    """Test cases for the rate limited login endpoint"""
+    
+    def test_429_response(self, client, fresh_limiter):
+        """Test the request past the login budget gets the 429 body and header"""
+        credentials = {"username": "nobody", "password": "wrongpassword"}
+        for _ in range(settings.LOGIN_RATE_LIMIT):
+            response = client.post("/auth/login", json=credentials)
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        
+        response = client.post("/auth/login", json=credentials)
+        
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == str(settings.RATE_LIMIT_PERIOD)
+        assert response.json() == {
+            "detail": RATE_LIMIT_MESSAGE,
+            "retry_after": fresh_limiter.detail
+        }
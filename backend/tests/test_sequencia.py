@@ -0,0 +1,77 @@
+"""
+Tests for named sequences and order numbering
+"""
+from datetime import datetime
+
+from sqlalchemy import literal, select
+
+from models import Pedido, Sequencia
+from routers.pedidos import generate_order_numbers
+
+
+class TestSequenciaReservar:
+    """Test cases for Sequencia.reservar"""
+    
+    def test_first_reservation_starts_after_inicio(self, db_session):
+        """Test a new sequence starts right after its seed value"""
+        assert list(Sequencia.reservar(db_session, "teste", inicio=10)) == [11]
+        assert db_session.get(Sequencia, "teste").valor == 11
+    
+    def test_consecutive_reservations(self, db_session):
+        """Test reservations hand out consecutive, non-overlapping ranges"""
+        primeira = Sequencia.reservar(db_session, "teste", 3)
+        segunda = Sequencia.reservar(db_session, "teste", 2)
+        
+        assert list(primeira) == [1, 2, 3]
+        assert list(segunda) == [4, 5]
+    
+    def test_inicio_ignored_once_created(self, db_session):
+        """Test the seed only applies to the reservation creating the row"""
+        Sequencia.reservar(db_session, "teste", inicio=5)
+        
+        assert list(Sequencia.reservar(db_session, "teste", inicio=100)) == [7]
+    
+    def test_inicio_subquery(self, db_session):
+        """Test the seed may be a scalar subquery"""
+        inicio = select(literal(41)).scalar_subquery()
+        
+        assert list(Sequencia.reservar(db_session, "teste", inicio=inicio)) == [42]
+    
+    def test_sequences_are_independent(self, db_session):
+        """Test each name keeps its own counter"""
+        Sequencia.reservar(db_session, "a", 5)
+        
+        assert list(Sequencia.reservar(db_session, "b")) == [1]
+    
+    def test_rollback_returns_values(self, db_session):
+        """Test a rolled back reservation hands the same values out again"""
+        Sequencia.reservar(db_session, "teste", 2)
+        db_session.commit()
+        Sequencia.reservar(db_session, "teste", 3)
+        db_session.rollback()
+        
+        assert list(Sequencia.reservar(db_session, "teste")) == [3]
+
+
+class TestOrderNumbers:
+    """Test cases for order numbers drawn from the daily sequence"""
+    
+    def test_numbers_are_sequential(self, db_session):
+        """Test order numbers are today's date followed by a counter"""
+        today = datetime.now().strftime("%Y%m%d")
+        
+        assert generate_order_numbers(db_session, 2) == [f"{today}0001", f"{today}0002"]
+        assert generate_order_numbers(db_session) == [f"{today}0003"]
+    
+    def test_seeded_from_existing_orders(self, db_session, admin_user):
+        """Test a new day's sequence continues after orders numbered without it"""
+        today = datetime.now().strftime("%Y%m%d")
+        db_session.add(Pedido(
+            numero=f"{today}0007",
+            tipo_cliente="VISITANTE",
+            usuario_id=admin_user.id,
+            forma_pagamento="DINHEIRO"
+        ))
+        db_session.commit()
+        
+        assert generate_order_numbers(db_session) == [f"{today}0008"]
@@ -0,0 +1,85 @@
+"""
+Tests for integer-coded enum columns
+"""
+import pytest
+from sqlalchemy import text
+
+import database
+from database import _encode_enum_columns
+from models import Usuario
+from models.usuario import PerfilUsuario
+
+
+def stored_perfil(db_session, user_id):
+    """Raw value of usuarios.perfil, bypassing the column type"""
+    return db_session.execute(
+        text("SELECT perfil FROM usuarios WHERE id = :id"), {"id": user_id}
+    ).scalar()
+
+
+class TestEnumInt:
+    """Test cases for the EnumInt column type"""
+    
+    def test_round_trip(self, db_session, admin_user):
+        """Test values are stored as codes and read back as plain strings"""
+        assert stored_perfil(db_session, admin_user.id) == 0
+        
+        admin_user.perfil = PerfilUsuario.COZINHA
+        db_session.commit()
+        db_session.expire_all()
+        
+        assert stored_perfil(db_session, admin_user.id) == 2
+        assert admin_user.perfil == "COZINHA"
+        assert type(admin_user.perfil) is str
+    
+    def test_filter_by_name(self, db_session, admin_user):
+        """Test comparisons against names are bound as codes"""
+        found = db_session.query(Usuario).filter(Usuario.perfil == "ADMIN").one()
+        assert found.id == admin_user.id
+        assert db_session.query(Usuario).filter(Usuario.perfil == "COZINHA").count() == 0
+    
+    def test_legacy_string_rows(self, db_session, admin_user):
+        """Test rows still holding the enum name are read unchanged"""
+        db_session.execute(
+            text("UPDATE usuarios SET perfil = 'ATENDENTE' WHERE id = :id"), {"id": admin_user.id}
+        )
+        db_session.commit()
+        db_session.expire_all()
+        
+        assert admin_user.perfil == "ATENDENTE"
+
+
+class TestEncodeEnumColumns:
+    """Test cases for the startup rewrite of legacy enum names"""
+    
+    @pytest.fixture(autouse=True)
+    def use_test_engine(self, monkeypatch, db_session):
+        """Run the migration against the test database"""
+        monkeypatch.setattr(database, "engine", db_session.get_bind())
+    
+    def test_rewrites_names_to_codes(self, db_session, admin_user):
+        """Test legacy names are converted to their codes"""
+        db_session.execute(
+            text("UPDATE usuarios SET perfil = 'ATENDENTE' WHERE id = :id"), {"id": admin_user.id}
+        )
+        db_session.commit()
+        
+        _encode_enum_columns()
+        
+        assert stored_perfil(db_session, admin_user.id) == 1
+        db_session.expire_all()
+        assert admin_user.perfil == "ATENDENTE"
+    
+    def test_idempotent(self, db_session, admin_user, atendente_user):
+        """Test running the migration again leaves encoded rows alone"""
+        db_session.execute(
+            text("UPDATE usuarios SET perfil = 'COZINHA' WHERE id = :id"), {"id": admin_user.id}
+        )
+        db_session.commit()
+        
+        _encode_enum_columns()
+        first = [stored_perfil(db_session, u.id) for u in (admin_user, atendente_user)]
+        _encode_enum_columns()
+        second = [stored_perfil(db_session, u.id) for u in (admin_user, atendente_user)]
+        
+        assert first == second == [2, 1]
@@ -2,14 +2,30 @@
 LANCH - Audit logging utilities
 """
 
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from typing import Optional, Any
-import json
+from typing import Optional, Any, Dict, Type
+from pydantic import BaseModel
+
+from models import Usuario
+from models.audit import AuditLog
+from middleware.audit import AuditLogger, AuditWriter, audit_writer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Session.info key holding entries waiting for their transaction to commit
+_PENDING_KEY = "audit_pending"
+
+
+def snapshot(schema: Type[BaseModel], obj: Any) -> Dict[str, Any]:
+    """Serialize an ORM object through its response schema for audit records"""
+    return schema.model_validate(obj).model_dump(mode="json")
 
 
 def log_action(
     db: Session,
-    usuario_id: Optional[int],
+    usuario: Optional[Usuario],
     acao: str,
     tabela: str,
     registro_id: Optional[int] = None,
@@ -17,16 +33,52 @@ def log_action(
     dados_novos: Optional[Any] = None,
     ip: Optional[str] = None
 ):
-    """Log an action to the audit table"""
-    from models.audit import AuditLog
+    """
+    Log an action to the audit table
     
-    log_entry = AuditLog(
-        usuario_id=usuario_id,
-        acao=acao,
-        tabela=tabela,
-        registro_id=registro_id,
-        dados_anteriores=json.dumps(dados_anteriores, default=str) if dados_anteriores else None,
-        dados_novos=json.dumps(dados_novos, default=str) if dados_novos else None,
-        ip=ip
+    The entry is held on the session and handed to the background audit
+    writer only once the caller's transaction commits, so a rolled back
+    change leaves no audit row and the request pays for no extra commit.
+    When the writer isn't running (scripts, tests without lifespan) it is
+    added to ``db`` instead. Either way, call this before committing.
+    """
+    entry = AuditLogger.build_entry(
+        acao,
+        user=usuario,
+        table_name=tabela,
+        record_id=registro_id,
+        old_value=dados_anteriores,
+        new_value=dados_novos
     )
-    db.add(log_entry)
+    entry["ip_address"] = ip
+    
+    if audit_writer.running:
+        # Tie the entry to a transaction so its rollback is seen
+        if not db.in_transaction():
+            db.begin()
+        db.info.setdefault(_PENDING_KEY, []).append(entry)
+    else:
+        db.add(AuditLog(**entry))
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session: Session):
+    """Pass the committed transaction's entries to the audit writer"""
+    entries = session.info.pop(_PENDING_KEY, None)
+    if not entries:
+        return
+    
+    unqueued = [entry for entry in entries if not audit_writer.enqueue(entry)]
+    if unqueued:
+        # Writer stopped since the entries were logged; save them directly
+        try:
+            AuditWriter._write(unqueued)
+        except Exception as e:
+            logger.error("Audit write failed: %s", e, extra={"entries": len(unqueued)})
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_uncommitted(session: Session, transaction):
+    """Drop entries whose transaction ended without committing"""
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -6,9 +6,16 @@ Validates .env configuration before application startup
 
 import os
 import sys
+import hashlib
 from pathlib import Path
 
 
+BASE_PATH = Path(__file__).parent.parent.parent
+ENV_FILE = BASE_PATH / '.env'
+VALIDATION_MARKER = BASE_PATH / 'logs' / '.env_validated'
+REQUIRED_DIRS = ('logs', 'exports', 'backups')
+
+
 class EnvValidator:
     """Validates environment configuration"""
     
@@ -96,11 +103,8 @@ class EnvValidator:
     
     def validate_directories(self) -> bool:
         """Validate required directories exist"""
-        base_path = Path(__file__).parent.parent.parent
-        required_dirs = ['logs', 'exports', 'backups']
-        
-        for dir_name in required_dirs:
-            dir_path = base_path / dir_name
+        for dir_name in REQUIRED_DIRS:
+            dir_path = BASE_PATH / dir_name
             if not dir_path.exists():
                 self.warnings.append(f"Directory '{dir_name}' does not exist and will be created")
         
@@ -111,7 +115,7 @@ class EnvValidator:
         from dotenv import load_dotenv
         
         # Load .env file
-        env_file = Path(__file__).parent.parent.parent / '.env'
+        env_file = ENV_FILE
         if not env_file.exists():
             self.errors.append(
                 f".env file not found at {env_file}. "
@@ -162,13 +166,36 @@ class EnvValidator:
             print("\n✅ Configuração validada com sucesso!")
 
 
+def _validation_key() -> bytes:
+    """Hash of everything the validation depends on"""
+    parts = [repr(sorted(os.environ.items()))]
+    parts.append(str(ENV_FILE.stat().st_mtime) if ENV_FILE.exists() else "")
+    parts.extend(str((BASE_PATH / d).exists()) for d in REQUIRED_DIRS)
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).digest()
+
+
 def validate_environment() -> bool:
     """Main validation function"""
+    # Skip if nothing changed since the last successful validation
+    key = _validation_key()
+    try:
+        if VALIDATION_MARKER.read_bytes() == key:
+            from dotenv import load_dotenv
+            load_dotenv(ENV_FILE)
+            return True
+    except OSError:
+        pass
+    
     validator = EnvValidator()
     is_valid = validator.validate_all()
     validator.print_results()
     
-    if not is_valid:
+    if is_valid:
+        try:
+            VALIDATION_MARKER.write_bytes(key)
+        except OSError:
+            pass
+    else:
         print("\n💡 Dica: Revise o arquivo .env e corrija os erros acima.")
         print("   Consulte .env.example para referência.\n")
     
@@ -3,7 +3,9 @@ LANCH - Pagination Utilities
 Provides consistent pagination across all list endpoints
 """
 
-from typing import TypeVar, Generic, List, Optional, Any
+from typing import TypeVar, Generic, List, Optional, Any, Tuple
+from datetime import datetime
+import base64
 from pydantic import BaseModel, Field
 from fastapi import Query
 from sqlalchemy.orm import Query as SQLQuery
@@ -86,6 +88,36 @@ def paginate(query: SQLQuery, page: int = 1, limit: int = 20) -> PaginatedRespon
     )
 
 
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    """
+    Encode a keyset position as an opaque cursor
+    
+    Args:
+        timestamp: Sort timestamp of the last row returned
+        id: Primary key of the last row returned, breaking timestamp ties
+        
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{timestamp.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 def get_pagination_params(
     skip: int = Query(default=0, ge=0, description="Number of records to skip"),
     limit: int = Query(default=50, ge=1, le=100, description="Maximum number of records")